@@ -3,6 +3,10 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from config import Config
+from app.utils.frame_cache import dataframe_cache
+from app.utils.csv_reader import csv_reader
+from app.utils.charts import chart_renderer
+from app.utils.chart_cache import chart_cache
 
 db = SQLAlchemy()
 login_manager = LoginManager()
@@ -15,6 +19,10 @@ def create_app(config_class=Config):
     db.init_app(app)
     login_manager.init_app(app)
     migrate.init_app(app, db)
+    dataframe_cache.init_app(app)
+    csv_reader.init_app(app)
+    chart_renderer.init_app(app)
+    chart_cache.init_app(app)
 
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -0,0 +1,132 @@
+import codecs
+import hashlib
+import os
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from flask import current_app
+from app import db
+from app.data.models import DataFile
+from app.data.profiles import update_profile
+from app.data.uploads import copy_stream, store_blob
+from app.data.utils import file_lock
+from app.utils.columnar import (convert_to_columnar, has_fresh_sidecar, read_source, remove_sidecar, sidecar_path,
+                                write_table, arrow_safe, to_arrow_table, to_pandas)
+from app.utils.csv_reader import sniff_file
+from app.utils.sampling import ReservoirSample, build_sample, has_sample, load_sample, save_sample
+
+
+def _widen_schema(schema, df):
+    # Integer columns whose new rows have blanks (or fractions) arrive as floats;
+    # widen them to float64, as a full re-parse of the combined CSV would
+    fields = [pa.field(field.name, pa.float64()) if pa.types.is_integer(field.type)
+              and pd.api.types.is_float_dtype(df[field.name]) else field for field in schema]
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def _read_new_rows(source_path, schema):
+    # Parse the appended file and coerce it to the existing columns and (possibly widened) types
+    df = arrow_safe(read_source(source_path))
+    if set(df.columns) != set(schema.names):
+        raise ValueError("Appended rows must have the same columns as the dataset")
+    schema = _widen_schema(schema, df)
+    try:
+        return to_arrow_table(df[schema.names]).cast(schema)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        raise ValueError(f"Appended rows do not match the dataset's column types: {e}")
+
+
+def _write_appended_blob(data_file, new_rows):
+    """Copy the existing CSV and the new rows into a new content-addressed blob.
+
+    The rows are written in the delimiter and encoding sniffed from the
+    existing file, so the blob still reads as one CSV.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    incoming = os.path.join(upload_folder, 'incoming')
+    os.makedirs(incoming, exist_ok=True)
+    tmp_path = os.path.join(incoming, f'{uuid.uuid4().hex}.upload')
+
+    encoding, delimiter = sniff_file(data_file.filepath)
+    encoder = codecs.getincrementalencoder(encoding)(errors='replace')
+    # Discard the byte order mark the first call emits; the file already has one
+    encoder.encode('')
+    newline = encoder.encode('\n')
+
+    hasher = hashlib.sha256()
+    with open(tmp_path, 'wb') as f, open(data_file.filepath, 'rb') as source:
+        copy_stream(source, f, hasher)
+        # The new rows must start on their own line
+        block = encoder.encode(new_rows.to_csv(sep=delimiter, header=False, index=False), final=True)
+        if f.tell() >= len(newline):
+            source.seek(-len(newline), os.SEEK_END)
+            if source.read(len(newline)) != newline:
+                block = newline + block
+        f.write(block)
+        hasher.update(block)
+
+    digest = hasher.hexdigest()
+    return store_blob(tmp_path, upload_folder, digest, 'csv'), digest
+
+
+def _append_sample(old_path, new_path, new_rows):
+    # Resume the old reservoir with the new rows; large files get a first sample
+    if has_sample(new_path):
+        return
+    if has_sample(old_path):
+        sample = load_sample(old_path)
+        reservoir = ReservoirSample.resume(sample, sample.attrs['sample']['population_rows'],
+                                           current_app.config['SAMPLE_ROWS'])
+        reservoir.update(new_rows)
+        save_sample(reservoir, new_path)
+    elif os.path.getsize(new_path) > current_app.config['SAMPLE_THRESHOLD_BYTES']:
+        build_sample(new_path, current_app.config['SAMPLE_ROWS'], current_app.config['STREAMING_CHUNK_ROWS'])
+
+
+def append_rows(data_file, source_path):
+    """Append the rows of ``source_path`` to a CSV DataFile.
+
+    The history is never re-parsed: the new rows are concatenated onto the
+    CSV bytes and onto the Arrow sidecar, the stored profile is merged with
+    the new rows' statistics, and an existing sample is resumed. The result
+    is a new blob, so the DataFile's path and hash change.
+    """
+    old_path = data_file.filepath
+    if not old_path.endswith('.csv'):
+        raise ValueError("Rows can only be appended to uncompressed CSV datasets")
+
+    # Held through the commit so a concurrent append to the same blob cannot
+    # build on a history that is about to be replaced
+    with file_lock(old_path):
+        db.session.refresh(data_file)
+        if data_file.filepath != old_path:
+            raise ValueError("The dataset changed while the rows were being appended; please try again")
+        if not has_fresh_sidecar(old_path):
+            convert_to_columnar(old_path)
+        history = feather.read_table(sidecar_path(old_path), memory_map=True)
+        new_table = _read_new_rows(source_path, history.schema)
+        new_rows = to_pandas(new_table)
+        if not len(new_rows):
+            return 0
+
+        new_path, digest = _write_appended_blob(data_file, new_rows)
+        if not has_fresh_sidecar(new_path):
+            # Only columns widened for the new rows are converted; the rest stay mapped
+            write_table(pa.concat_tables([history.cast(new_table.schema), new_table]), sidecar_path(new_path))
+        _append_sample(old_path, new_path, new_rows)
+
+        data_file.filepath = new_path
+        data_file.sha256 = digest
+        db.session.commit()
+
+    chunksize = current_app.config['STREAMING_CHUNK_ROWS']
+    update_profile(data_file, (new_rows.iloc[start:start + chunksize] for start in range(0, len(new_rows), chunksize)))
+
+    # Drop the old blob unless another upload still points at it
+    if not DataFile.query.filter(DataFile.filepath == old_path).count():
+        if os.path.exists(old_path):
+            os.remove(old_path)
+        remove_sidecar(old_path)
+
+    return len(new_rows)
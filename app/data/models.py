@@ -1,14 +1,25 @@
 from app import db
 from datetime import datetime
+from sqlalchemy.dialects import mysql
+
+# Bump whenever the stored profile layout changes; older rows get recomputed
+PROFILE_VERSION = 5
 
 class DataFile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(256))
     filepath = db.Column(db.String(512))
+    sha256 = db.Column(db.String(64), index=True)
     uploaded_at = db.Column(db.DateTime, index=True, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     analyses = db.relationship('Analysis', backref='data_file', lazy='dynamic')
     predictions = db.relationship('Prediction', backref='data_file', lazy='dynamic')
+    profile = db.relationship('DatasetProfile', backref='data_file', uselist=False, cascade='all, delete-orphan')
+
+    @property
+    def content_key(self):
+        # Identical uploads share cached data; rows from before hashing fall back to their id
+        return self.sha256 or self.id
 
 class Analysis(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -26,4 +37,13 @@ class Prediction(db.Model):
     parameters = db.Column(db.Text)
     metrics = db.Column(db.Text)
     result_path = db.Column(db.String(512))
-    created_at = db.Column(db.DateTime, index=True, default=datetime.utcnow)
\ No newline at end of file
+    created_at = db.Column(db.DateTime, index=True, default=datetime.utcnow)
+
+class DatasetProfile(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    data_file_id = db.Column(db.Integer, db.ForeignKey('data_file.id'), index=True, unique=True)
+    version = db.Column(db.Integer, default=PROFILE_VERSION)
+    summary = db.Column(db.Text().with_variant(mysql.LONGTEXT(), 'mysql'))
+    # Mergeable StreamingSummary accumulators, so appended rows update the summary without a rescan
+    state = db.Column(db.Text().with_variant(mysql.LONGTEXT(), 'mysql'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,122 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.data.models import DataFile, DatasetProfile, PROFILE_VERSION
+from app.utils.data_analysis import DataAnalyzer
+from app.utils.streaming_stats import StreamingSummary
+from app.utils.datetimes import parse_datetime_columns
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _analyzer(data_file, sheet=None):
+    # Files past the threshold are summarised chunk by chunk instead of in one DataFrame
+    streaming = os.path.getsize(data_file.filepath) > current_app.config['STREAMING_STATS_THRESHOLD_BYTES']
+    return DataAnalyzer(data_file.filepath,
+                        cache_key=data_file.content_key,
+                        streaming=streaming,
+                        chunksize=current_app.config['STREAMING_CHUNK_ROWS'],
+                        sheet=sheet)
+
+
+def compute_summary_stats(data_file, sheet=None):
+    return _analyzer(data_file, sheet).get_summary_stats()
+
+
+def compute_profile(data_file):
+    """Return (summary, state): the summary statistics and their mergeable accumulators."""
+    summary, accumulators = _analyzer(data_file).profile()
+    return summary, accumulators.to_state()
+
+
+def _dumps(value):
+    return json.dumps(value, default=_json_default)
+
+
+def _shared_profile(data_file):
+    # A current profile of another upload with identical bytes
+    if not data_file.sha256:
+        return None
+    return DatasetProfile.query.join(DataFile).filter(
+        DataFile.sha256 == data_file.sha256,
+        DataFile.id != data_file.id,
+        DatasetProfile.version == PROFILE_VERSION
+    ).first()
+
+
+def build_profile(data_file, reuse=True):
+    """Compute the summary statistics for a DataFile and persist them.
+
+    With ``reuse`` a profile already computed for the same content is copied
+    instead of recomputed.
+    """
+    shared = _shared_profile(data_file) if reuse else None
+    if shared is not None:
+        summary, state = shared.summary, shared.state
+    else:
+        summary, state = map(_dumps, compute_profile(data_file))
+    return _store_profile(data_file, summary, state)
+
+
+def update_profile(data_file, chunks):
+    """Fold appended rows into the stored profile without rescanning the existing data.
+
+    Counts, means and variances merge with Chan's update, and min/max, null
+    counts and the quantile, distinct-count and top-value sketches merge
+    directly. Without a current stored state the profile is rebuilt instead.
+    """
+    profile = data_file.profile
+    if profile is None or profile.version != PROFILE_VERSION or not profile.state:
+        return build_profile(data_file, reuse=False)
+
+    accumulators = StreamingSummary.from_state(json.loads(profile.state))
+    datetime_formats = json.loads(profile.summary).get('datetime_formats')
+    for chunk in chunks:
+        accumulators.update(parse_datetime_columns(chunk, datetime_formats))
+    summary = accumulators.result()
+    summary['datetime_formats'] = datetime_formats
+    return _store_profile(data_file, _dumps(summary), _dumps(accumulators.to_state()))
+
+
+def _store_profile(data_file, summary, state):
+    profile = data_file.profile or DatasetProfile(data_file_id=data_file.id)
+    profile.version = PROFILE_VERSION
+    profile.summary = summary
+    profile.state = state
+    data_file.profile = profile
+    db.session.add(profile)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request stored this file's first profile meanwhile; use theirs
+        db.session.rollback()
+        db.session.refresh(data_file)
+        return data_file.profile
+    return profile
+
+
+def get_summary_stats(data_file, recompute=False, sheet=None):
+    """Return the stored profile, rebuilding it when missing, outdated or on request.
+
+    Only the first sheet of a workbook is persisted; other sheets are
+    summarised on request from their own lazily built sidecar.
+    """
+    if sheet:
+        return json.loads(_dumps(compute_summary_stats(data_file, sheet)))
+
+    profile = data_file.profile
+    if recompute or profile is None or profile.version != PROFILE_VERSION:
+        profile = build_profile(data_file, reuse=not recompute)
+    return json.loads(profile.summary)
@@ -1,12 +1,23 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, send_file, abort
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 import os
+import click
 from datetime import datetime
-from app.data.models import DataFile, Analysis, Prediction
+from app.data.models import DataFile, Analysis, Prediction, PROFILE_VERSION
 from app.utils.data_analysis import DataAnalyzer
 from app.utils.ml_models import MLPredictor
 from app.utils.pdf_generator import PDFGenerator
+from app.utils.csv_reader import ZIP_SUFFIXES, check_zip
+from app.utils.columnar import convert_to_columnar, has_fresh_sidecar, remove_sidecar, list_sheets
+from app.utils.frame_cache import dataframe_cache
+from app.utils.chart_cache import chart_cache
+from app.utils.sampling import build_sample, has_sample
+from app.utils.preview import preview_file
+from app.data.profiles import build_profile, get_summary_stats
+from app.data.uploads import ChunkedUpload, ChecksumMismatch, UploadTooLarge, save_stream, save_temp
+from app.data.appends import append_rows
+from app.data.utils import get_file_extension, file_lock
 from app import db
 import json
 from io import BytesIO
@@ -32,25 +43,239 @@ def upload():
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
             upload_folder = current_app.config['UPLOAD_FOLDER']
-            os.makedirs(upload_folder, exist_ok=True)
-            filepath = os.path.join(upload_folder, filename)
-            file.save(filepath)
-
-            # Save file info to database
-            data_file = DataFile(
-                filename=filename,
-                filepath=filepath,
-                user_id=current_user.id
-            )
-            db.session.add(data_file)
-            db.session.commit()
+            filepath, digest = save_stream(file, upload_folder, get_file_extension(filename))
+            error = _rejected_archive(filepath)
+            if error:
+                flash(error, 'error')
+                return redirect(request.url)
+
+            data_file = _register_upload(filename, filepath, digest)
 
             flash('File successfully uploaded', 'success')
-            return redirect(url_for('data.analyze', file_id=data_file.id))
+            return redirect(url_for('data.upload_preview', file_id=data_file.id))
 
     return render_template('data/upload.html')
 
 
+def _rejected_archive(filepath):
+    # A zip must hold exactly one CSV; anything else is refused before it is recorded
+    if not filepath.endswith(ZIP_SUFFIXES):
+        return None
+    try:
+        check_zip(filepath)
+    except ValueError as e:
+        if not DataFile.query.filter(DataFile.filepath == filepath).count():
+            os.remove(filepath)
+        return str(e)
+    return None
+
+
+def _register_upload(filename, filepath, digest):
+    # Only record the upload; parsing and profiling wait until after the preview
+    data_file = DataFile(
+        filename=filename,
+        filepath=filepath,
+        sha256=digest,
+        user_id=current_user.id
+    )
+    db.session.add(data_file)
+    db.session.commit()
+    return data_file
+
+
+def _ingest(data_file):
+    """Build whatever derived data is still missing for an upload (cheap once done).
+
+    The preview's background /ingest and a click through to analyze
+    routinely overlap; the per-file lock makes the later one wait and then
+    find everything built.
+    """
+    with file_lock(data_file.filepath):
+        # A new transaction (and expired objects) sees a profile another request stored while we waited
+        db.session.commit()
+        _build_derived_data(data_file)
+
+
+def _build_derived_data(data_file):
+    filepath = data_file.filepath
+
+    # Parse once into the columnar sidecar so analyze/predict skip CSV/XLSX parsing.
+    # Blobs are content-addressed, so a re-upload of identical bytes already has one.
+    # Files too large to parse whole and impossible to stream stay without one.
+    if not has_fresh_sidecar(filepath):
+        try:
+            convert_to_columnar(filepath, max_in_memory_bytes=current_app.config['STREAMING_STATS_THRESHOLD_BYTES'])
+        except Exception as e:
+            current_app.logger.warning('Could not build columnar sidecar for %s: %s', filepath, e)
+
+    # Profile once so analyze/predict pages are a single DB read
+    if data_file.profile is None or data_file.profile.version != PROFILE_VERSION:
+        try:
+            build_profile(data_file)
+        except Exception as e:
+            # Keep the session usable for the rest of the request
+            db.session.rollback()
+            current_app.logger.warning('Could not profile %s: %s', filepath, e)
+
+    # Large files also get a uniform sample so interactive analysis stays fast
+    if os.path.getsize(filepath) > current_app.config['SAMPLE_THRESHOLD_BYTES'] and not has_sample(filepath):
+        try:
+            build_sample(filepath, current_app.config['SAMPLE_ROWS'], current_app.config['STREAMING_CHUNK_ROWS'])
+        except Exception as e:
+            current_app.logger.warning('Could not build sample for %s: %s', filepath, e)
+
+
+def _requested_sheet(data_file):
+    # Workbook sheet chosen with ?sheet=<index>; CSV files only have sheet 0
+    sheet = request.args.get('sheet', 0, type=int)
+    sheets = list_sheets(data_file.filepath)
+    if sheet < 0 or sheet >= len(sheets or [None]):
+        abort(404)
+    return sheet, sheets
+
+
+def _get_chunked_upload(upload_id):
+    upload = ChunkedUpload.load(current_app.config['UPLOAD_FOLDER'], upload_id)
+    if upload is None or upload.meta['user_id'] != current_user.id:
+        abort(404)
+    return upload
+
+
+# Chunked upload API: start, append parts by offset, query the offset to resume, complete
+@data_bp.route('/uploads', methods=['POST'])
+@login_required
+def start_chunked_upload():
+    filename = secure_filename((request.get_json(silent=True) or {}).get('filename', ''))
+    if not filename or not allowed_file(filename):
+        return jsonify({'error': 'Unsupported file type'}), 400
+
+    # Abandoned uploads are cleared out as new ones start
+    ChunkedUpload.expire_stale(current_app.config['UPLOAD_FOLDER'], current_app.config['UPLOAD_EXPIRY_SECONDS'])
+    upload = ChunkedUpload.create(current_app.config['UPLOAD_FOLDER'], current_user.id, filename)
+    return jsonify({
+        'upload_id': upload.upload_id,
+        'offset': 0,
+        'chunk_size': current_app.config['UPLOAD_CHUNK_SIZE']
+    }), 201
+
+
+@data_bp.route('/uploads/<upload_id>', methods=['GET'])
+@login_required
+def chunked_upload_status(upload_id):
+    upload = _get_chunked_upload(upload_id)
+    return jsonify({'upload_id': upload.upload_id, 'offset': upload.offset})
+
+
+@data_bp.route('/uploads/<upload_id>', methods=['PUT'])
+@login_required
+def upload_chunk(upload_id):
+    upload = _get_chunked_upload(upload_id)
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'error': 'Missing offset'}), 400
+
+    try:
+        new_offset = upload.append(request.stream, offset, max_bytes=current_app.config['MAX_CONTENT_LENGTH'])
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e), 'offset': upload.offset}), 413
+    except ValueError as e:
+        # The client is out of sync; tell it where to resume
+        return jsonify({'error': str(e), 'offset': upload.offset}), 409
+
+    return jsonify({'upload_id': upload.upload_id, 'offset': new_offset})
+
+
+@data_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def cancel_chunked_upload(upload_id):
+    _get_chunked_upload(upload_id).discard()
+    return jsonify({'upload_id': upload_id, 'cancelled': True})
+
+
+@data_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+@login_required
+def complete_chunked_upload(upload_id):
+    upload = _get_chunked_upload(upload_id)
+    expected = (request.get_json(silent=True) or {}).get('sha256')
+    filename = upload.meta['filename']
+    try:
+        filepath, digest = upload.finish(get_file_extension(filename), expected_sha256=expected)
+    except ChecksumMismatch as e:
+        return jsonify({'error': 'Checksum mismatch', 'sha256': e.digest}), 422
+    error = _rejected_archive(filepath)
+    if error:
+        return jsonify({'error': error}), 422
+    data_file = _register_upload(filename, filepath, digest)
+
+    return jsonify({
+        'file_id': data_file.id,
+        'sha256': digest,
+        'redirect': url_for('data.upload_preview', file_id=data_file.id)
+    })
+
+
+@data_bp.route('/upload_preview/<int:file_id>')
+@login_required
+def upload_preview(file_id):
+    data_file = DataFile.query.get_or_404(file_id)
+
+    if data_file.user_id != current_user.id:
+        flash("You do not have permission to access this file", "error")
+        return redirect(url_for('main.home'))
+
+    # Only the head of the file is read; the full parse runs via /ingest
+    try:
+        head, info = preview_file(data_file.filepath, current_app.config['PREVIEW_ROWS'])
+    except Exception as e:
+        current_app.logger.warning('Could not preview %s: %s', data_file.filepath, e)
+        return redirect(url_for('data.analyze', file_id=data_file.id))
+
+    return render_template('data/upload_preview.html',
+                           file_id=data_file.id,
+                           filename=data_file.filename,
+                           head=head,
+                           info=info)
+
+
+@data_bp.route('/ingest/<int:file_id>', methods=['POST'])
+@login_required
+def ingest(file_id):
+    data_file = DataFile.query.get_or_404(file_id)
+    if data_file.user_id != current_user.id:
+        abort(404)
+
+    _ingest(data_file)
+    return jsonify({'file_id': data_file.id, 'ready': True})
+
+
+@data_bp.route('/append/<int:file_id>', methods=['POST'])
+@login_required
+def append(file_id):
+    data_file = DataFile.query.get_or_404(file_id)
+
+    if data_file.user_id != current_user.id:
+        flash("You do not have permission to access this file", "error")
+        return redirect(url_for('main.home'))
+
+    file = request.files.get('file')
+    if file is None or file.filename == '' or not allowed_file(file.filename):
+        flash('Select a CSV or Excel file with the rows to append', 'error')
+        return redirect(url_for('data.dashboard'))
+
+    source_path = save_temp(file, current_app.config['UPLOAD_FOLDER'],
+                            get_file_extension(secure_filename(file.filename)))
+    try:
+        added = append_rows(data_file, source_path)
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('data.dashboard'))
+    finally:
+        os.remove(source_path)
+
+    flash(f'Appended {added} rows to {data_file.filename}', 'success')
+    return redirect(url_for('data.analyze', file_id=data_file.id))
+
+
 @data_bp.route('/analyze/<int:file_id>', methods=['GET', 'POST'])
 @login_required
 def analyze(file_id):
@@ -60,8 +285,11 @@ def analyze(file_id):
         flash('You do not have permission to access this file', 'error')
         return redirect(url_for('main.home'))
 
-    analyzer = DataAnalyzer(data_file.filepath)
-    summary_stats = analyzer.get_summary_stats()
+    _ingest(data_file)
+    sheet, sheets = _requested_sheet(data_file)
+    summary_stats = get_summary_stats(data_file, sheet=sheet)
+    # Only the first sheet is sampled at upload
+    sample_available = not sheet and has_sample(data_file.filepath)
 
     # Add debug prints
     print("Summary stats keys:", summary_stats.keys())
@@ -72,16 +300,23 @@ def analyze(file_id):
 
     if request.method == 'POST':
         selected_columns = request.form.getlist('columns')
-        visualizations = analyzer.generate_visualizations(selected_columns)
+        sampled = sample_available and request.form.get('mode', 'sample') != 'exact'
+        analyzer = DataAnalyzer(data_file.filepath, cache_key=data_file.content_key,
+                                compact=current_app.config['COMPACT_LOAD'], sheet=sheet, sample=sampled,
+                                datetime_formats=summary_stats.get('datetime_formats'),
+                                top_k=current_app.config['CHART_TOP_K'])
+        visualizations = analyzer.generate_visualizations(selected_columns, summary_stats)
 
         # Generate PDF preview
-        pdf_bytes = PDFGenerator.generate_analysis_report(summary_stats, visualizations)
+        pdf_bytes = PDFGenerator.generate_analysis_report(summary_stats, visualizations,
+                                                          sample_info=analyzer.sample_info,
+                                                          correlation_pairs=analyzer.correlation_pairs(selected_columns))
 
         # Save analysis to database
         analysis = Analysis(
             data_file_id=data_file.id,
             analysis_type='exploratory',
-            parameters=json.dumps({'columns': selected_columns}),
+            parameters=json.dumps({'columns': selected_columns, 'sheet': sheet, 'sample': sampled}),
             result_path=None  # We'll update this after saving the file
         )
         db.session.add(analysis)
@@ -101,12 +336,17 @@ def analyze(file_id):
                                file_id=data_file.id,
                                analysis_id=analysis.id,
                                report_data=base64.b64encode(pdf_bytes).decode('utf-8'),
-                               report_type='analysis')
+                               report_type='analysis',
+                               memory_report=analyzer.memory_report)
 
     return render_template('data/analyze.html',
                            file_id=data_file.id,
                            columns=summary_stats['columns'],
-                           summary_stats=summary_stats)
+                           summary_stats=summary_stats,
+                           sample_available=sample_available,
+                           sample_rows=current_app.config['SAMPLE_ROWS'],
+                           sheet=sheet,
+                           sheets=sheets)
 
 @data_bp.route('/predict/<int:file_id>', methods=['GET', 'POST'])
 @login_required
@@ -117,8 +357,9 @@ def predict(file_id):
         flash('You do not have permission to access this file', 'error')
         return redirect(url_for('main.home'))
 
-    analyzer = DataAnalyzer(data_file.filepath)
-    summary_stats = analyzer.get_summary_stats()
+    _ingest(data_file)
+    sheet, sheets = _requested_sheet(data_file)
+    summary_stats = get_summary_stats(data_file, sheet=sheet)
     numeric_cols = [col for col, dtype in summary_stats['dtypes'].items() if 'float' in dtype or 'int' in dtype]
 
     if request.method == 'POST':
@@ -126,7 +367,11 @@ def predict(file_id):
         model_type = request.form.get('model_type')
 
         # Prepare and train model
-        ml_predictor = MLPredictor(data_file.filepath)
+        ml_predictor = MLPredictor(data_file.filepath, cache_key=data_file.content_key,
+                                   compact=current_app.config['COMPACT_LOAD'], sheet=sheet,
+                                   datetime_formats=summary_stats.get('datetime_formats'),
+                                   max_points=current_app.config['SCATTER_MAX_POINTS'],
+                                   scatter_mode=current_app.config['SCATTER_MODE'])
         X_train, X_test, y_train, y_test = ml_predictor.prepare_data(target_column)
         model = ml_predictor.train_model(model_type, X_train, y_train)
         metrics, y_pred = ml_predictor.evaluate_model(model, X_test, y_test)
@@ -146,7 +391,7 @@ def predict(file_id):
             data_file_id=data_file.id,
             model_type=model_type,
             target_column=target_column,
-            parameters=json.dumps({'test_size': 0.2}),
+            parameters=json.dumps({'test_size': 0.2, 'sheet': sheet}),
             metrics=json.dumps(metrics),
             result_path=None  # We'll update this after saving the file
         )
@@ -167,11 +412,14 @@ def predict(file_id):
                                file_id=data_file.id,
                                prediction_id=prediction.id,
                                report_data=base64.b64encode(pdf_bytes).decode('utf-8'),
-                               report_type='prediction')
+                               report_type='prediction',
+                               memory_report=ml_predictor.memory_report)
 
     return render_template('data/predict.html',
                            file_id=data_file.id,
-                           numeric_cols=numeric_cols)
+                           numeric_cols=numeric_cols,
+                           sheet=sheet,
+                           sheets=sheets)
 
 
 @data_bp.route('/download/<report_type>/<int:report_id>')
@@ -200,9 +448,40 @@ def dashboard():
     return render_template('data/dashboard.html', data_files=data_files)
 
 
+@data_bp.route('/profile/<int:file_id>/recompute', methods=['POST'])
+@login_required
+def recompute_profile(file_id):
+    data_file = DataFile.query.get_or_404(file_id)
+
+    if data_file.user_id != current_user.id:
+        flash("You do not have permission to access this file", "error")
+        return redirect(url_for('main.home'))
+
+    get_summary_stats(data_file, recompute=True)
+    flash("Dataset profile recomputed", "success")
+    return redirect(url_for('data.analyze', file_id=data_file.id))
+
+
+@data_bp.cli.command('recompute-profiles')
+def recompute_profiles():
+    """Rebuild stored dataset profiles that are missing or use an old format."""
+    for data_file in DataFile.query.all():
+        if data_file.profile is None or data_file.profile.version != PROFILE_VERSION:
+            build_profile(data_file, reuse=False)
+            click.echo(f"Profiled {data_file.id}: {data_file.filename}")
+
+
+@data_bp.route('/cache_stats')
+@login_required
+def cache_stats():
+    # Per-worker numbers: each gunicorn worker process holds its own cache
+    # (the chart cache's files are shared, but its hit counters are per worker)
+    return jsonify({**dataframe_cache.stats(), 'charts': chart_cache.stats()})
+
+
 def allowed_file(filename):
     return '.' in filename and \
-        filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+        get_file_extension(filename) in current_app.config['ALLOWED_EXTENSIONS']
 
 #adding
 @data_bp.route('/view_file/<int:file_id>')
@@ -214,7 +493,7 @@ def view_file(file_id):
         flash("You do not have permission to access this file", "error")
         return redirect(url_for('main.home'))
 
-    return send_file(data_file.filepath)
+    return send_file(data_file.filepath, download_name=data_file.filename)
 
 
 @data_bp.route('/view_report/<report_type>/<int:report_id>')
@@ -265,9 +544,12 @@ def delete_file(file_id):
             os.remove(prediction.result_path)
         db.session.delete(prediction)
 
-    # Delete the file from filesystem
-    if os.path.exists(data_file.filepath):
-        os.remove(data_file.filepath)
+    # Delete the file from filesystem unless another upload shares the same blob
+    shared = DataFile.query.filter(DataFile.filepath == data_file.filepath, DataFile.id != data_file.id).count()
+    if not shared:
+        if os.path.exists(data_file.filepath):
+            os.remove(data_file.filepath)
+        remove_sidecar(data_file.filepath)
 
     db.session.delete(data_file)
     db.session.commit()
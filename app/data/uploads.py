@@ -0,0 +1,194 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """The upload would grow past its size limit."""
+
+
+class ChecksumMismatch(ValueError):
+    """The assembled upload does not hash to the SHA-256 the client sent."""
+
+    def __init__(self, digest):
+        super().__init__(f"Checksum mismatch, upload hashes to {digest}")
+        self.digest = digest
+
+
+def copy_stream(source, destination, hasher, buffer_size=COPY_BUFFER_SIZE):
+    """Copy a stream to an open file in fixed-size blocks, hashing as it goes."""
+    written = 0
+    while True:
+        block = source.read(buffer_size)
+        if not block:
+            break
+        destination.write(block)
+        hasher.update(block)
+        written += len(block)
+    return written
+
+
+def blob_path(upload_folder, digest, extension):
+    return os.path.join(upload_folder, 'blobs', digest[:2], f'{digest}.{extension}')
+
+
+def store_blob(tmp_path, upload_folder, digest, extension):
+    """Move a fully written file into the content-addressed store.
+
+    Identical bytes always land on the same path, so a re-upload just drops
+    its temp file and reuses the existing blob and everything derived from it.
+    """
+    path = blob_path(upload_folder, digest, extension)
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+    return path
+
+
+def save_temp(file, upload_folder, extension):
+    """Stream a Werkzeug upload to a scratch file in UPLOAD_FOLDER/incoming; the caller removes it."""
+    incoming = os.path.join(upload_folder, 'incoming')
+    os.makedirs(incoming, exist_ok=True)
+    path = os.path.join(incoming, f'{uuid.uuid4().hex}.{extension}')
+    with open(path, 'wb') as f:
+        copy_stream(file.stream, f, hashlib.sha256())
+    return path
+
+
+def save_stream(file, upload_folder, extension):
+    """Stream a Werkzeug upload into the blob store; returns (path, SHA-256)."""
+    incoming = os.path.join(upload_folder, 'incoming')
+    os.makedirs(incoming, exist_ok=True)
+    tmp_path = os.path.join(incoming, f'{uuid.uuid4().hex}.upload')
+
+    hasher = hashlib.sha256()
+    with open(tmp_path, 'wb') as f:
+        copy_stream(file.stream, f, hasher)
+    digest = hasher.hexdigest()
+    return store_blob(tmp_path, upload_folder, digest, extension), digest
+
+
+class ChunkedUpload:
+    """A resumable upload written part by part to UPLOAD_FOLDER/incoming.
+
+    Clients append each part at the current offset; after an interruption
+    they ask for the offset and continue from there.
+    """
+
+    ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+    def __init__(self, upload_folder, upload_id, meta):
+        self.upload_folder = upload_folder
+        self.upload_id = upload_id
+        self.meta = meta
+        directory = os.path.join(upload_folder, 'incoming')
+        self.part_path = os.path.join(directory, f'{upload_id}.part')
+        self.meta_path = os.path.join(directory, f'{upload_id}.json')
+
+    @classmethod
+    def create(cls, upload_folder, user_id, filename):
+        os.makedirs(os.path.join(upload_folder, 'incoming'), exist_ok=True)
+        meta = {
+            'user_id': user_id,
+            'filename': filename,
+            'created_at': datetime.utcnow().isoformat()
+        }
+        upload = cls(upload_folder, uuid.uuid4().hex, meta)
+        open(upload.part_path, 'wb').close()
+        with open(upload.meta_path, 'w') as f:
+            json.dump(meta, f)
+        return upload
+
+    @classmethod
+    def load(cls, upload_folder, upload_id):
+        if not cls.ID_PATTERN.match(upload_id):
+            return None
+        meta_path = os.path.join(upload_folder, 'incoming', f'{upload_id}.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            return cls(upload_folder, upload_id, json.load(f))
+
+    @staticmethod
+    def expire_stale(upload_folder, max_age):
+        """Remove uploads and scratch files in UPLOAD_FOLDER/incoming untouched for ``max_age`` seconds."""
+        incoming = os.path.join(upload_folder, 'incoming')
+        if not os.path.isdir(incoming):
+            return
+        cutoff = time.time() - max_age
+        for entry in os.scandir(incoming):
+            try:
+                touched = entry.stat().st_mtime
+                if entry.name.endswith('.json'):
+                    # Metadata is written once; the part file shows whether the upload is still active
+                    part_path = os.path.join(incoming, entry.name[:-len('.json')] + '.part')
+                    if os.path.exists(part_path):
+                        touched = max(touched, os.path.getmtime(part_path))
+                if touched < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                continue
+
+    @property
+    def offset(self):
+        return os.path.getsize(self.part_path)
+
+    def append(self, stream, offset, max_bytes=None):
+        """Write the next part; ``offset`` must equal the bytes received so far.
+
+        An exclusive flock on the part file serialises writers across worker
+        processes, so a retried part never interleaves with one still being
+        written. Parts that would take the upload past ``max_bytes`` are
+        rejected with UploadTooLarge and leave the file as it was.
+        """
+        with open(self.part_path, 'ab') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise ValueError("Another part of this upload is still being written")
+            size = os.fstat(f.fileno()).st_size
+            if offset != size:
+                raise ValueError(f"Expected offset {size}, got {offset}")
+
+            written = size
+            for block in iter(lambda: stream.read(COPY_BUFFER_SIZE), b''):
+                written += len(block)
+                if max_bytes and written > max_bytes:
+                    f.truncate(size)
+                    raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit")
+                f.write(block)
+        return written
+
+    def finish(self, extension, expected_sha256=None):
+        """Hash the assembled file and move it into the blob store; returns (path, SHA-256).
+
+        The file is hashed once, here: parts may have been written by
+        different worker processes. With ``expected_sha256`` a mismatch
+        raises ChecksumMismatch and the upload stays resumable.
+        """
+        with open(self.part_path, 'rb') as f:
+            # Held while hashing and moving, so no part can be appended in between
+            fcntl.flock(f, fcntl.LOCK_EX)
+            hasher = hashlib.sha256()
+            for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+                hasher.update(block)
+            digest = hasher.hexdigest()
+            if expected_sha256 and expected_sha256.lower() != digest:
+                raise ChecksumMismatch(digest)
+            path = store_blob(self.part_path, self.upload_folder, digest, extension)
+        self.discard()
+        return path, digest
+
+    def discard(self):
+        for path in (self.part_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
@@ -1,10 +1,15 @@
+import fcntl
 import os
+from contextlib import contextmanager
 from werkzeug.utils import secure_filename
 
+# Extensions of compressed CSVs, kept whole as in "data.csv.gz"
+COMPOUND_EXTENSIONS = ('csv.gz', 'csv.zst', 'csv.zip')
+
 
 def allowed_file(filename, allowed_extensions):
     return '.' in filename and \
-        filename.rsplit('.', 1)[1].lower() in allowed_extensions
+        get_file_extension(filename) in allowed_extensions
 
 
 def save_uploaded_file(file, upload_folder):
@@ -18,4 +23,20 @@ def save_uploaded_file(file, upload_folder):
 
 
 def get_file_extension(filename):
-    return filename.rsplit('.', 1)[1].lower()
\ No newline at end of file
+    # Compound for compressed CSVs ("csv.gz"), otherwise the last suffix, so "sales.2024.zip" is "zip"
+    name = filename.lower()
+    for extension in COMPOUND_EXTENSIONS:
+        if name.endswith('.' + extension) and len(name) > len(extension) + 1:
+            return extension
+    return name.rsplit('.', 1)[-1]
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on ``path + '.lock'``, shared by every worker process on the host."""
+    with open(path + '.lock', 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,108 @@
+import base64
+import hashlib
+import os
+import threading
+import uuid
+
+# Bump when chart drawing changes so stale images are never served
+CHART_STYLE_VERSION = 4
+# Eviction trims to this share of the budget so it does not rerun on every put
+EVICT_TO = 0.9
+
+
+class ChartCache:
+    """On-disk cache of rendered chart PNGs, bounded by total bytes.
+
+    Keys hash the dataset's content key with the chart kind, column and
+    rendering parameters, so any worker on the host can reuse a chart.
+    Reads refresh a file's mtime and eviction removes the oldest files
+    first, which makes the directory an LRU.
+    """
+
+    def __init__(self, directory=None, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.directory = app.config.get('CHART_CACHE_DIR', self.directory)
+        self.max_bytes = app.config.get('CHART_CACHE_MAX_BYTES', self.max_bytes)
+
+    @property
+    def enabled(self):
+        return bool(self.directory and self.max_bytes)
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha256(repr((CHART_STYLE_VERSION,) + parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.png')
+
+    def get(self, key):
+        """Return the cached chart as base64, or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return base64.b64encode(data).decode('utf-8')
+
+    def put(self, key, chart):
+        path = self._path(key)
+        data = base64.b64decode(chart)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so readers never see a half-written image
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_total()
+            else:
+                self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.png'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def _scan_total(self):
+        return sum(size for _, size, _ in self._files())
+
+    def _evict(self):
+        # Caller holds the lock. Other workers share the directory, so rescan it.
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._total_bytes = total
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'bytes': self._total_bytes, 'max_bytes': self.max_bytes}
+
+
+chart_cache = ChartCache()
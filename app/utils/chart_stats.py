@@ -0,0 +1,147 @@
+import numpy as np
+
+MAX_BINS = 200
+# Resolution of the grid the KDE is evaluated on
+KDE_GRID = 1024
+# Outliers beyond this many are thinned for drawing; the extremes are always kept
+MAX_FLIERS = 2000
+# Bars in a datetime column's histogram
+DATETIME_BINS = 50
+# Cells per axis of the 2-D histogram that stands in for a large scatter plot
+DENSITY_BINS = 200
+# Quantile bands of x that a stratified downsample draws from evenly
+STRATA = 50
+
+
+def _finite(values):
+    if hasattr(values, 'to_numpy'):
+        # Nullable pandas dtypes hold pd.NA, which np.asarray cannot convert
+        values = values.to_numpy(dtype=float, na_value=np.nan)
+    values = np.asarray(values, dtype=float)
+    return values[np.isfinite(values)]
+
+
+def _bin_count(n, low, high, iqr):
+    # numpy's 'auto' rule: the smaller of the Freedman-Diaconis and Sturges widths
+    if high <= low:
+        return 1
+    sturges = (high - low) / (np.log2(n) + 1)
+    width = min(2 * iqr / np.cbrt(n), sturges) if iqr > 0 else sturges
+    return int(min(max(np.ceil((high - low) / width), 1), MAX_BINS))
+
+
+def _binned_kde(fine_counts, low, dx, n, bandwidth):
+    """Gaussian KDE of binned data: the bin counts convolved with the kernel via FFT.
+
+    Costs O(grid log grid) instead of O(n * grid) for the exact sum.
+    """
+    pad = int(min(np.ceil(3 * bandwidth / dx), 4 * len(fine_counts)))
+    counts = np.concatenate([np.zeros(pad), fine_counts, np.zeros(pad)])
+    offsets = np.arange(-pad, pad + 1) * dx
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+
+    size = len(counts) + len(kernel) - 1
+    fft_size = 1 << (size - 1).bit_length()
+    smoothed = np.fft.irfft(np.fft.rfft(counts, fft_size) * np.fft.rfft(kernel, fft_size), fft_size)
+    density = np.maximum(smoothed[pad:pad + len(counts)], 0) / n
+
+    centers = low + (np.arange(len(counts)) - pad + 0.5) * dx
+    return centers, density
+
+
+def box_stats(values, q1, median, q3):
+    """matplotlib ``bxp`` statistics with 1.5 IQR whiskers and a bounded flier subset."""
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    fliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    if len(fliers) > MAX_FLIERS:
+        fliers = np.sort(fliers)
+        fliers = fliers[np.unique(np.linspace(0, len(fliers) - 1, MAX_FLIERS).astype(int))]
+    return {
+        'med': median, 'q1': q1, 'q3': q3,
+        'whislo': float(inside.min()) if len(inside) else q1,
+        'whishi': float(inside.max()) if len(inside) else q3,
+        'fliers': fliers
+    }
+
+
+def distribution_stats(values):
+    """Histogram, KDE curve and box statistics for a numeric column.
+
+    One partition for the quartiles and one histogram pass over a fine grid
+    cover everything: display bins are sums of fine bins and the KDE is
+    smoothed from the same fine counts. Returns None for a column with no
+    finite values.
+    """
+    values = _finite(values)
+    n = len(values)
+    if not n:
+        return None
+    low, high = float(values.min()), float(values.max())
+    q1, median, q3 = (float(q) for q in np.percentile(values, [25, 50, 75]))
+
+    bins = _bin_count(n, low, high, q3 - q1)
+    per_bin = max(KDE_GRID // bins, 1)
+    span = (low, high) if high > low else (low - 0.5, high + 0.5)
+    fine_counts, fine_edges = np.histogram(values, bins=bins * per_bin, range=span)
+    fine_counts = fine_counts.astype(float)
+    dx = fine_edges[1] - fine_edges[0]
+
+    stats = {
+        'edges': fine_edges[::per_bin],
+        'counts': fine_counts.reshape(bins, per_bin).sum(axis=1),
+        'box': box_stats(values, q1, median, q3),
+        'kde_x': None,
+        'kde_y': None
+    }
+
+    std = float(values.std(ddof=1)) if n > 1 else 0.0
+    if std > 0:
+        # Scott's rule, as scipy's gaussian_kde (and so seaborn) uses by default
+        bandwidth = std * n ** -0.2
+        x, density = _binned_kde(fine_counts, span[0], dx, n, bandwidth)
+        # Scaled from density to counts per display bin, like histplot(kde=True)
+        stats['kde_x'], stats['kde_y'] = x, density * n * dx * per_bin
+    return stats
+
+
+def datetime_stats(seconds, bins=DATETIME_BINS):
+    """Histogram of a datetime column given as epoch seconds (NaN for missing).
+
+    Returns ``{'edges': datetime64[ns] array, 'counts': array}``, or None for
+    a column with no dates.
+    """
+    seconds = _finite(seconds)
+    if not len(seconds):
+        return None
+    low, high = seconds.min(), seconds.max()
+    span = (low, high) if high > low else (low - 0.5, high + 0.5)
+    counts, edges = np.histogram(seconds, bins=bins, range=span)
+    return {'edges': np.round(edges * 1e9).astype(np.int64).astype('datetime64[ns]'), 'counts': counts}
+
+
+def density_grid(x, y, bins=DENSITY_BINS):
+    """2-D histogram of the points as ``(counts, x_edges, y_edges)``, for drawing in place of a scatter."""
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    present = np.isfinite(x) & np.isfinite(y)
+    return np.histogram2d(x[present], y[present], bins=bins)
+
+
+def stratified_sample(x, y, size, strata=STRATA, seed=0):
+    """About ``size`` points, drawn in proportion from each quantile band of ``x``.
+
+    Unlike a plain random subset, sparse tails of ``x`` keep their share of
+    points. The seed is fixed so the same data always draws the same chart.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    if len(x) <= size:
+        return x, y
+    rng = np.random.default_rng(seed)
+    bands = np.searchsorted(np.quantile(x, np.linspace(0, 1, strata + 1)[1:-1]), x, side='right')
+    # Random keys ranked within each band: taking the lowest ranks draws without replacement
+    order = np.lexsort((rng.random(len(x)), bands))
+    band_sizes = np.bincount(bands, minlength=strata)
+    band_starts = np.concatenate([[0], np.cumsum(band_sizes)[:-1]])
+    ranks = np.arange(len(x)) - np.repeat(band_starts, band_sizes)
+    keep = np.sort(order[ranks < np.repeat(np.ceil(band_sizes * size / len(x)), band_sizes)])
+    return x[keep], y[keep]
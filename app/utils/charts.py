@@ -0,0 +1,212 @@
+import base64
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+import numpy as np
+import pandas as pd
+import seaborn as sns
+import matplotlib.dates as mdates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+from app.utils.chart_cache import chart_cache
+
+EXECUTORS = ('process', 'thread')
+
+
+# Chart functions run inside pool workers: module level so they pickle by
+# reference. Each builds its own Figure on an Agg canvas and never touches
+# pyplot, so no global figure state is shared between threads.
+
+def _figure(figsize):
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _encode(fig):
+    buf = BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight')
+    return base64.b64encode(buf.getvalue()).decode('utf-8')
+
+
+def distribution_chart(col, stats):
+    # Numeric data - histogram and boxplot, drawn from chart_stats.distribution_stats
+    fig = _figure((12, 5))
+    ax1, ax2 = fig.subplots(1, 2)
+    color = sns.color_palette()[0]
+
+    if stats is not None:
+        edges = stats['edges']
+        ax1.bar(edges[:-1], stats['counts'], width=np.diff(edges), align='edge',
+                color=color, alpha=0.75, edgecolor='white', linewidth=0.5)
+        if stats['kde_x'] is not None:
+            ax1.plot(stats['kde_x'], stats['kde_y'], color=color)
+        ax2.bxp([stats['box']], widths=0.8, patch_artist=True,
+                boxprops={'facecolor': color, 'alpha': 0.75},
+                medianprops={'color': 'black'},
+                flierprops={'marker': 'd', 'markersize': 4, 'markerfacecolor': 'gray', 'markeredgecolor': 'gray'})
+        ax2.set_xticks([])
+    ax1.set_xlabel(col)
+    ax1.set_ylabel('Count')
+    ax1.set_title(f'Histogram of {col}')
+    ax2.set_ylabel(col)
+    ax2.set_title(f'Boxplot of {col}')
+    fig.tight_layout()
+    return _encode(fig)
+
+
+def datetime_chart(col, stats):
+    # Dates - counts over time rather than one bar per timestamp, from chart_stats.datetime_stats
+    fig = _figure((12, 5))
+    ax = fig.subplots()
+    if stats is not None:
+        edges = mdates.date2num(stats['edges'])
+        ax.bar(edges[:-1], stats['counts'], width=np.diff(edges), align='edge',
+               color=sns.color_palette()[0], alpha=0.75, edgecolor='white', linewidth=0.5)
+        ax.xaxis_date()
+    ax.set_xlabel(col)
+    ax.set_ylabel('Count')
+    ax.set_title(f'Distribution of {col} over time')
+    ax.tick_params(axis='x', labelrotation=30)
+    fig.tight_layout()
+    return _encode(fig)
+
+
+def category_chart(title, labels, counts):
+    # Counts are already aggregated, so plain bars; most frequent at the top
+    fig = _figure((10, 6))
+    ax = fig.subplots()
+    positions = np.arange(len(labels))
+    ax.barh(positions, counts, color=sns.color_palette()[0])
+    ax.set_yticks(positions, labels)
+    ax.invert_yaxis()
+    ax.set_xlabel('count')
+    ax.set_title(title)
+    fig.tight_layout()
+    return _encode(fig)
+
+
+def heatmap_chart(corr, title='Correlation Heatmap', annot=True):
+    # corr arrives already pruned and ordered by correlation.heatmap_view
+    fig = _figure((10, 8))
+    ax = fig.subplots()
+    sns.heatmap(corr, annot=annot, fmt='.2f', cmap='coolwarm', center=0, vmin=-1, vmax=1,
+                xticklabels=True, yticklabels=True, ax=ax)
+    ax.tick_params(labelsize=8 if annot else 6)
+    ax.set_title(title)
+    fig.tight_layout()
+    return _encode(fig)
+
+
+def actual_vs_predicted_chart(target_column, y_test, y_pred, title=None):
+    fig = _figure((10, 6))
+    ax = fig.subplots()
+    ax.scatter(y_test, y_pred, alpha=0.5)
+    ax.plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], 'k--', lw=2)
+    ax.set_xlabel('Actual')
+    ax.set_ylabel('Predicted')
+    ax.set_title(title or f'Actual vs Predicted {target_column}')
+    return _encode(fig)
+
+
+def actual_vs_predicted_density_chart(target_column, counts, x_edges, y_edges):
+    # Large test sets: a 2-D histogram from chart_stats.density_grid instead of one marker per row
+    fig = _figure((10, 6))
+    ax = fig.subplots()
+    mesh = ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts, 0).T, norm=LogNorm(vmin=1), cmap='viridis')
+    fig.colorbar(mesh, ax=ax, label='rows')
+    ax.plot([x_edges[0], x_edges[-1]], [x_edges[0], x_edges[-1]], 'k--', lw=2)
+    ax.set_xlabel('Actual')
+    ax.set_ylabel('Predicted')
+    ax.set_title(f'Actual vs Predicted {target_column} ({int(counts.sum()):,} rows, density)')
+    return _encode(fig)
+
+
+def feature_importance_chart(importances, features):
+    fig = _figure((10, 6))
+    ax = fig.subplots()
+    pd.Series(np.asarray(importances), index=features).nlargest(10).plot(kind='barh', ax=ax)
+    ax.set_title('Top 10 Feature Importance')
+    return _encode(fig)
+
+
+class ChartRenderer:
+    """Renders independent charts in parallel on a bounded pool.
+
+    A job is ``(name, function, args)``, optionally with a chart cache key;
+    ``args`` may be a callable returning them, so cached charts skip that work.
+    ``render`` returns ``{name: base64 PNG}`` in job order, drawing only the
+    charts that are not cached. With one worker (or a single job) charts are
+    drawn inline.
+    ``executor`` is ``process`` (spawned workers, parallel across cores) or
+    ``thread`` (shared by concurrent requests in one process; safe because
+    the chart functions never use pyplot).
+    """
+
+    def __init__(self, workers=None, executor='process'):
+        self.workers = workers
+        self.executor = executor
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        executor = app.config.get('CHART_EXECUTOR', self.executor)
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown CHART_EXECUTOR {executor!r}, expected one of {', '.join(EXECUTORS)}")
+        self.executor = executor
+        self.workers = app.config.get('CHART_WORKERS', self.workers)
+
+    @property
+    def max_workers(self):
+        return self.workers or min(os.cpu_count() or 1, 8)
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                if self.executor == 'thread':
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='charts')
+                else:
+                    # Spawned, not forked, so workers never inherit the parent's threads or locks
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def render(self, jobs):
+        """Render ``(name, function, args[, cache_key])`` jobs; keyed ones are served from the chart cache."""
+        results = {}
+        pending = []
+        for job in jobs:
+            name, function, args = job[:3]
+            key = job[3] if len(job) > 3 and chart_cache.enabled else None
+            cached = chart_cache.get(key) if key else None
+            if cached is None:
+                pending.append((name, function, args, key))
+            results[name] = cached
+
+        pending = [(name, function, args() if callable(args) else args, key) for name, function, args, key in pending]
+        for (name, _, _, key), chart in zip(pending, self._render(pending)):
+            results[name] = chart
+            if key:
+                chart_cache.put(key, chart)
+        return results
+
+    def _render(self, jobs):
+        if self.max_workers <= 1 or len(jobs) <= 1:
+            return [function(*args) for _, function, args, _ in jobs]
+
+        try:
+            executor = self._executor()
+            futures = [executor.submit(function, *args) for _, function, args, _ in jobs]
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool next time
+            with self._lock:
+                self._pool = None
+            return [function(*args) for _, function, args, _ in jobs]
+
+
+chart_renderer = ChartRenderer()
@@ -0,0 +1,267 @@
+import glob
+import os
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+import openpyxl
+from app.utils.compaction import compact_dataframe
+from app.utils.csv_reader import csv_reader, is_csv
+from app.utils.datetimes import parse_datetime_columns
+
+
+SIDECAR_SUFFIX = '.arrow'
+XLSX_BATCH_ROWS = 50_000
+
+
+def sidecar_path(file_path, sheet=None):
+    # The first sheet (or a CSV) uses the plain sidecar; other sheets get their own
+    if sheet:
+        return f'{file_path}.sheet{sheet}{SIDECAR_SUFFIX}'
+    return file_path + SIDECAR_SUFFIX
+
+
+def sample_path(file_path, sheet=None):
+    # Persisted reservoir sample, see app.utils.sampling
+    return f'{file_path}.sample{sheet or 0}{SIDECAR_SUFFIX}'
+
+
+def list_sheets(file_path):
+    """Sheet names of a workbook (read from its index only), or None for non-Excel files."""
+    if not file_path.endswith('.xlsx'):
+        return None
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def header_names(row):
+    # Same naming as pd.read_excel: blank headers become "Unnamed: i", repeats get ".n"
+    names = []
+    seen = {}
+    for i, value in enumerate(row):
+        name = f'Unnamed: {i}' if value is None else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def read_xlsx_sheet(file_path, sheet=0):
+    """Read one worksheet with openpyxl's streaming read-only mode.
+
+    Rows are pulled one at a time from the sheet XML and collected into
+    DataFrame batches, so the workbook's cell DOM is never built.
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[sheet or 0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        columns = header_names(header)
+
+        batches = []
+        batch = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append(row[:len(columns)])
+            if len(batch) >= XLSX_BATCH_ROWS:
+                batches.append(pd.DataFrame.from_records(batch, columns=columns))
+                batch = []
+        if batch or not batches:
+            batches.append(pd.DataFrame.from_records(batch, columns=columns))
+    finally:
+        workbook.close()
+
+    df = pd.concat(batches, ignore_index=True) if len(batches) > 1 else batches[0]
+    return df.infer_objects()
+
+
+def read_source(file_path, sheet=None):
+    if is_csv(file_path):
+        return csv_reader.read(file_path)
+    elif file_path.endswith('.xlsx'):
+        return read_xlsx_sheet(file_path, sheet)
+    else:
+        raise ValueError("Unsupported file format")
+
+
+def arrow_safe(df):
+    # Arrow needs string column names and one type per column; Excel sheets in
+    # particular can mix numbers and text in the same object column.
+    df.columns = [str(col) for col in df.columns]
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith('mixed'):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def to_arrow_table(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # Keep NaN as a float value instead of an Arrow null: columns without a
+    # validity bitmap convert back to pandas without copying.
+    for i, col in enumerate(df.columns):
+        if pd.api.types.is_float_dtype(df[col]) and not isinstance(df[col].dtype, pd.api.extensions.ExtensionDtype):
+            table = table.set_column(i, table.field(i), pa.array(df[col].to_numpy(), from_pandas=False))
+    return table
+
+
+def convert_to_columnar(file_path, sheet=None, max_in_memory_bytes=None):
+    """Parse the uploaded file (or one sheet of it) once and store it as an Arrow/Feather sidecar.
+
+    The sidecar is written uncompressed so it can be memory-mapped: every
+    worker on the host then reads the same page-cache pages. CSVs are
+    streamed into it block by block, so their size is not bounded by
+    memory. Files that cannot be streamed are parsed whole, unless they
+    are larger than ``max_in_memory_bytes``; then ValueError is raised and
+    the file is read in chunks from the original instead.
+    """
+    path = sidecar_path(file_path, sheet)
+    if is_csv(file_path) and csv_reader.engine == 'pyarrow':
+        try:
+            with csv_reader.open_batches(file_path) as batches:
+                return write_batches(batches.schema, batches, path)
+        except (ValueError, pa.ArrowException):
+            # Types changed after the first block, duplicate headers, ...
+            pass
+
+    if max_in_memory_bytes and os.path.getsize(file_path) > max_in_memory_bytes:
+        raise ValueError(f"{os.path.basename(file_path)} is too large to convert in memory")
+    df = arrow_safe(read_source(file_path, sheet))
+    write_table(to_arrow_table(df), path)
+    return path
+
+
+def _nan_floats(batch):
+    # As in to_arrow_table: NaN instead of nulls keeps float columns zero-copy
+    columns = [pc.fill_null(column, float('nan')) if pa.types.is_floating(column.type) and column.null_count
+               else column for column in batch.columns]
+    return pa.RecordBatch.from_arrays(columns, schema=batch.schema)
+
+
+def _write_atomically(path, write):
+    # Write to a temp file first so readers never see a half-written file. The
+    # name is unique, so concurrent writers of the same sidecar never share one.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def write_batches(schema, batches, path):
+    """Atomically write record batches to an uncompressed Arrow file, holding one batch at a time."""
+    def write(tmp_path):
+        with pa.ipc.new_file(tmp_path, schema) as writer:
+            for batch in batches:
+                writer.write_batch(_nan_floats(batch))
+    return _write_atomically(path, write)
+
+
+def write_table(table, path):
+    """Atomically write an Arrow table as an uncompressed Feather file, one batch per existing chunk."""
+    # Chunks are not split further; a single-chunk table maps each column to one array
+    return _write_atomically(path, lambda tmp_path: feather.write_feather(
+        table, tmp_path, compression='uncompressed', chunksize=max(table.num_rows, 1)))
+
+
+def has_fresh_sidecar(file_path, sheet=None):
+    path = sidecar_path(file_path, sheet)
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(file_path)
+
+
+def to_pandas(table):
+    # One block per column lets null-free numeric columns stay views over the
+    # mapped file (read-only arrays) instead of being consolidated into copies.
+    return table.to_pandas(split_blocks=True)
+
+
+def _ensure_sheet_sidecar(file_path, sheet):
+    # Workbook sheets are converted lazily, the first time each one is requested
+    if file_path.endswith('.xlsx') and not has_fresh_sidecar(file_path, sheet):
+        convert_to_columnar(file_path, sheet)
+
+
+def _read_dataframe(file_path, columns=None, sheet=None):
+    _ensure_sheet_sidecar(file_path, sheet)
+    if has_fresh_sidecar(file_path, sheet):
+        try:
+            table = feather.read_table(sidecar_path(file_path, sheet), columns=columns, memory_map=True)
+            return to_pandas(table)
+        except (OSError, pa.ArrowInvalid):
+            pass
+    df = arrow_safe(read_source(file_path, sheet))
+    return df[columns] if columns is not None else df
+
+
+def load_dataframe(file_path, compact=False, columns=None, sheet=None, datetime_formats=None):
+    """Load from the columnar sidecar when it is up to date, otherwise parse the original.
+
+    ``columns`` restricts the read to those columns; on the sidecar only
+    their buffers are touched. ``sheet`` picks a workbook sheet by index.
+    ``datetime_formats`` ({column: strftime format}, as cached in the
+    profile) parses those text columns as datetimes without inference.
+    With ``compact`` numerics are downcast and low-cardinality text becomes
+    ``category``; the per-column savings end up in ``df.attrs['memory_report']``.
+    """
+    df = parse_datetime_columns(_read_dataframe(file_path, columns, sheet), datetime_formats)
+    if compact:
+        df, _ = compact_dataframe(df)
+    return df
+
+
+def read_schema(file_path, sheet=None):
+    """Column names and Arrow types from the sidecar footer, or None without a sidecar."""
+    _ensure_sheet_sidecar(file_path, sheet)
+    if not has_fresh_sidecar(file_path, sheet):
+        return None
+    schema = pa.ipc.open_file(pa.memory_map(sidecar_path(file_path, sheet))).schema
+    return {field.name: field.type for field in schema if not field.name.startswith('__index_level_')}
+
+
+def is_numeric_type(type_):
+    return pa.types.is_integer(type_) or pa.types.is_floating(type_) or pa.types.is_decimal(type_)
+
+
+def iter_dataframe_chunks(file_path, chunksize=100_000, sheet=None):
+    """Yield the dataset as DataFrame chunks without materialising the whole file."""
+    _ensure_sheet_sidecar(file_path, sheet)
+    if has_fresh_sidecar(file_path, sheet):
+        # Not closed explicitly: yielded frames may still reference the mapped buffers
+        reader = pa.ipc.open_file(pa.memory_map(sidecar_path(file_path, sheet)))
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            # Slicing a mapped batch is zero-copy; only the current slice is paged in
+            for start in range(0, batch.num_rows, chunksize):
+                yield to_pandas(batch.slice(start, chunksize))
+    elif is_csv(file_path):
+        for chunk in csv_reader.iter_chunks(file_path, chunksize):
+            yield arrow_safe(chunk)
+    else:
+        df = load_dataframe(file_path, sheet=sheet)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+
+def remove_sidecar(file_path):
+    # Removes the main sidecar, any per-sheet ones, any persisted samples and the blob's file_lock file
+    paths = glob.glob(glob.escape(file_path) + f'.sheet*{SIDECAR_SUFFIX}') + [sidecar_path(file_path)]
+    paths += glob.glob(glob.escape(file_path) + f'.sample*{SIDECAR_SUFFIX}')
+    paths.append(file_path + '.lock')
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
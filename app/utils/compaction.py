@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+
+def _downcast_numeric(series):
+    if pd.api.types.is_bool_dtype(series):
+        return series
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+    if pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+        # Only narrow floats whose values survive the round trip exactly
+        values = series.to_numpy()
+        narrowed = values.astype(np.float32)
+        if np.array_equal(narrowed.astype(values.dtype), values, equal_nan=True):
+            return series.astype(np.float32)
+    return series
+
+
+def compact_dataframe(df, max_category_ratio=0.5):
+    """Shrink a DataFrame's memory footprint without changing its values.
+
+    Numeric columns are downcast to the smallest dtype that holds them and
+    text columns whose distinct values make up at most ``max_category_ratio``
+    of the rows become ``category``. Returns the compacted frame and a
+    per-column report of bytes before/after.
+    """
+    compacted = {}
+    report = {}
+
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series):
+            new_series = _downcast_numeric(series)
+        elif (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)) \
+                and len(series) and series.nunique(dropna=True) <= max_category_ratio * len(series):
+            new_series = series.astype('category')
+        else:
+            new_series = series
+
+        compacted[col] = new_series
+        if new_series.dtype != series.dtype:
+            before = int(series.memory_usage(deep=True, index=False))
+            after = int(new_series.memory_usage(deep=True, index=False))
+            report[col] = {
+                'from': str(series.dtype),
+                'to': str(new_series.dtype),
+                'bytes_before': before,
+                'bytes_after': after,
+                'bytes_saved': before - after
+            }
+
+    result = pd.DataFrame(compacted, index=df.index)
+    result.attrs['memory_report'] = report
+    return result, report
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.spatial.distance import squareform
+
+# Wider matrices are pruned to the columns with the strongest correlations
+MAX_HEATMAP_COLUMNS = 30
+# Cells are annotated with their value only up to this many columns
+ANNOTATE_COLUMNS = 15
+TOP_PAIRS = 20
+
+
+def _centered(df):
+    # float32, column-major so each column is contiguous for the matrix products
+    values = np.empty(df.shape, dtype=np.float32, order='F')
+    for i, col in enumerate(df.columns):
+        column = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        finite = np.isfinite(column)
+        # Centering first keeps float32 sums of squares from cancelling
+        mean = column[finite].mean() if finite.any() else 0.0
+        values[:, i] = np.where(finite, column - mean, np.nan)
+    return values
+
+
+def correlation_matrix(df):
+    """Pearson correlations of the numeric frame, like ``DataFrame.corr()``.
+
+    The work is a handful of float32 matrix products, which BLAS runs
+    multi-threaded, instead of pandas' pairwise loop. Missing values are
+    handled pairwise-complete, as pandas does.
+    """
+    columns = df.columns
+    values = _centered(df)
+    valid = np.isfinite(values)
+
+    if valid.all():
+        norms = np.linalg.norm(values, axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values /= norms
+        corr = values.T @ values
+    else:
+        values[~valid] = 0
+        mask = valid.astype(np.float32)
+        # Sums over the rows where both columns of a pair are present
+        counts = mask.T @ mask
+        sums = values.T @ mask
+        squares = (values * values).T @ mask
+        products = values.T @ values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = products - sums * sums.T / counts
+            var = squares - sums ** 2 / counts
+            corr = cov / np.sqrt(var * var.T)
+        corr[counts < 2] = np.nan
+
+    corr = np.clip(corr.astype(np.float64), -1, 1)
+    return pd.DataFrame(corr, index=columns, columns=columns)
+
+
+def strongest_pairs(corr, limit=TOP_PAIRS):
+    """The ``limit`` column pairs with the largest |r|, as ``(column, column, r)``."""
+    values = corr.to_numpy()
+    rows, cols = np.triu_indices(len(values), k=1)
+    r = values[rows, cols]
+    present = np.isfinite(r)
+    rows, cols, r = rows[present], cols[present], r[present]
+    order = np.argsort(-np.abs(r), kind='stable')[:limit]
+    return [(corr.columns[rows[i]], corr.columns[cols[i]], float(r[i])) for i in order]
+
+
+def _cluster_order(corr):
+    if len(corr) < 3:
+        return np.arange(len(corr))
+    # Strongly (anti-)correlated columns are close; constant columns are far from everything
+    distance = 1 - np.abs(np.nan_to_num(corr.to_numpy()))
+    np.fill_diagonal(distance, 0)
+    return leaves_list(linkage(squareform(distance, checks=False), method='average'))
+
+
+def heatmap_view(corr, limit=MAX_HEATMAP_COLUMNS):
+    """The part of ``corr`` worth drawing, ordered so correlated columns sit together.
+
+    Beyond ``limit`` columns only those with the strongest correlation to
+    any other column are kept.
+    """
+    if len(corr) > limit:
+        off_diagonal = corr.abs().mask(np.eye(len(corr), dtype=bool))
+        keep = off_diagonal.max().fillna(0).nlargest(limit).index
+        corr = corr.loc[keep, keep]
+    order = _cluster_order(corr)
+    return corr.iloc[order, order]
@@ -0,0 +1,174 @@
+import codecs
+import csv
+import zipfile
+from contextlib import contextmanager
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from charset_normalizer import from_bytes
+
+
+ENGINES = ('pyarrow', 'pandas')
+
+# Compressed CSV uploads and the codec that inflates them
+COMPRESSED_CSV = {'.csv.gz': 'gzip', '.csv.zst': 'zstd'}
+ZIP_SUFFIXES = ('.zip',)
+
+SNIFF_BYTES = 64 * 1024
+DELIMITERS = ',;\t|'
+
+
+def is_csv(file_path):
+    return file_path.endswith('.csv') or file_path.endswith(tuple(COMPRESSED_CSV) + ZIP_SUFFIXES)
+
+
+def _zip_csv_member(archive):
+    """Name of the one CSV in an open zip archive; ValueError unless there is exactly one."""
+    # macOS adds a "__MACOSX/._<name>" resource fork for every file it zips
+    members = [name for name in archive.namelist()
+               if name.lower().endswith('.csv') and not name.startswith('__MACOSX/')]
+    if len(members) != 1:
+        raise ValueError("Zip archive contains no CSV file" if not members else
+                         f"Zip archive contains {len(members)} CSV files; upload one CSV per archive")
+    return members[0]
+
+
+def check_zip(file_path):
+    """Raise ValueError unless ``file_path`` is a zip archive holding exactly one CSV."""
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            _zip_csv_member(archive)
+    except zipfile.BadZipFile:
+        raise ValueError("The file is not a valid zip archive")
+
+
+def open_csv(file_path):
+    """Open a plain or compressed CSV as a binary stream of decompressed bytes.
+
+    Compressed files are inflated block by block as the stream is read, so
+    the uncompressed text never exists in memory or on disk as a whole. A
+    zip archive must contain exactly one CSV.
+    """
+    for suffix, codec in COMPRESSED_CSV.items():
+        if file_path.endswith(suffix):
+            return pa.input_stream(file_path, compression=codec)
+    if file_path.endswith(ZIP_SUFFIXES):
+        archive = zipfile.ZipFile(file_path)
+        try:
+            member = _zip_csv_member(archive)
+        except ValueError:
+            archive.close()
+            raise
+        return archive.open(member)
+    return open(file_path, 'rb')
+
+
+def sniff_csv(head):
+    """Guess (encoding, delimiter) from the first bytes of a CSV."""
+    match = from_bytes(head).best()
+    encoding = codecs.lookup(match.encoding).name if match is not None else 'utf-8'
+    if encoding == 'ascii':
+        # An ASCII head says nothing about later bytes; UTF-8 reads it the same
+        encoding = 'utf-8'
+    text = head.decode(encoding, errors='replace')
+    # Sniff whole lines only; the block usually ends mid-row
+    sample = text[:text.rfind('\n') + 1] or text
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ','
+    return encoding, delimiter
+
+
+def sniff_file(file_path):
+    with open_csv(file_path) as stream:
+        return sniff_csv(stream.read(SNIFF_BYTES))
+
+
+class CSVReader:
+    """CSV parser shared by every loader, configured from ``CSV_ENGINE``.
+
+    The ``pyarrow`` engine splits the file into blocks and parses them on a
+    thread pool; ``pandas`` is the single-threaded C parser. Both use the
+    encoding and delimiter sniffed from the head of the file, as the upload
+    preview does, and both return
+    the same dtypes: dates and timestamps stay text, as pandas leaves them,
+    and are parsed later with the profile's cached formats. Files pyarrow
+    cannot read the way pandas would (duplicate headers, parse errors) fall
+    back to pandas.
+    """
+
+    def __init__(self, engine='pyarrow', threads=None, block_size=16 * 1024 * 1024):
+        self.engine = engine
+        self.threads = threads
+        self.block_size = block_size
+
+    def init_app(self, app):
+        engine = app.config.get('CSV_ENGINE', self.engine)
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown CSV_ENGINE {engine!r}, expected one of {', '.join(ENGINES)}")
+        self.engine = engine
+        self.threads = app.config.get('CSV_READ_THREADS', self.threads)
+        self.block_size = app.config.get('CSV_BLOCK_SIZE', self.block_size)
+        if self.engine == 'pyarrow' and self.threads:
+            pa.set_cpu_count(self.threads)
+
+    def read(self, file_path):
+        if self.engine == 'pyarrow':
+            try:
+                return self._read_pyarrow(file_path)
+            except (ValueError, pa.ArrowException):
+                # Parse errors, undecodable text, types pyarrow cannot convert
+                pass
+        with open_csv(file_path) as stream:
+            return pd.read_csv(stream, **self._pandas_options(file_path))
+
+    def iter_chunks(self, file_path, chunksize):
+        # Always pandas: its chunked reader keeps only one chunk of rows in memory
+        options = self._pandas_options(file_path)
+        with open_csv(file_path) as stream:
+            yield from pd.read_csv(stream, chunksize=chunksize, **options)
+
+    @staticmethod
+    def _pandas_options(file_path):
+        encoding, delimiter = sniff_file(file_path)
+        return {'sep': delimiter, 'encoding': encoding, 'encoding_errors': 'replace'}
+
+    @contextmanager
+    def open_batches(self, file_path):
+        """Open the CSV as a pyarrow reader of record batches, one parsed block at a time.
+
+        Column types are the ones ``read`` produces. Types are inferred from
+        the first block, so a later block that does not fit them raises
+        ``pa.ArrowInvalid`` while iterating.
+        """
+        read_options, parse_options, convert_options = self._pyarrow_options(file_path)
+        with open_csv(file_path) as stream:
+            yield pa_csv.open_csv(stream, read_options=read_options, parse_options=parse_options,
+                                  convert_options=convert_options)
+
+    def _pyarrow_options(self, file_path):
+        encoding, delimiter = sniff_file(file_path)
+        read_options = pa_csv.ReadOptions(use_threads=True, block_size=self.block_size, encoding=encoding)
+        parse_options = pa_csv.ParseOptions(delimiter=delimiter)
+        # The streaming reader infers the schema from the first block only
+        with open_csv(file_path) as stream:
+            schema = pa_csv.open_csv(stream, read_options=read_options, parse_options=parse_options).schema
+        if len(set(schema.names)) != len(schema.names):
+            # pandas renames repeats to "name.1"; leave that to it
+            raise ValueError("Duplicate column names")
+
+        # pyarrow would infer date32/timestamp columns where pandas keeps the text
+        text_columns = {field.name: pa.string() for field in schema if pa.types.is_temporal(field.type)}
+        # Empty fields become NaN, as with pandas
+        return read_options, parse_options, pa_csv.ConvertOptions(strings_can_be_null=True, column_types=text_columns)
+
+    def _read_pyarrow(self, file_path):
+        read_options, parse_options, convert_options = self._pyarrow_options(file_path)
+        with open_csv(file_path) as stream:
+            table = pa_csv.read_csv(stream, read_options=read_options, parse_options=parse_options,
+                                    convert_options=convert_options)
+        return table.to_pandas(split_blocks=True)
+
+
+csv_reader = CSVReader()
@@ -1,86 +1,262 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-import base64
 import json
+from app.utils import charts
+from app.utils.charts import chart_renderer
+from app.utils.chart_cache import chart_cache
+from app.utils.chart_stats import distribution_stats, datetime_stats
+from app.utils.correlation import correlation_matrix, heatmap_view, strongest_pairs, ANNOTATE_COLUMNS, TOP_PAIRS
+from app.utils.columnar import load_dataframe, iter_dataframe_chunks, read_schema, is_numeric_type
+from app.utils.frame_cache import dataframe_cache
+from app.utils.streaming_stats import StreamingSummary
+from app.utils.compaction import compact_dataframe
+from app.utils.sampling import load_sample
+from app.utils.datetimes import detect_datetime_formats, parse_datetime_columns, datetime_to_seconds
+from app.utils.profiler import profile_frame, sketch_frame, TOP_VALUES
+
+# Numeric columns with at most this many distinct values are charted as categories
+LOW_CARDINALITY = 10
 
 
 class DataAnalyzer:
-    def __init__(self, file_path):
+    def __init__(self, file_path, cache_key=None, streaming=False, chunksize=100_000, compact=False, sheet=None,
+                 sample=False, datetime_formats=None, top_k=TOP_VALUES):
         self.file_path = file_path
-        self.df = self._load_data()
+        # {column: format} cached in the profile; None means detect them on first summary
+        self.datetime_formats = datetime_formats
+        self.cache_key = cache_key
+        self.compact = compact
+        self.sheet = sheet
+        # Work on the persisted reservoir sample instead of the full dataset
+        self.sample = sample
+        self.streaming = streaming
+        self.chunksize = chunksize
+        # Bars per categorical chart; less frequent values are grouped as "Other"
+        self.top_k = top_k
+        self._df = None
+        # Column-projected frame loaded for charts, when the full frame was not needed
+        self._projected = None
+
+    @property
+    def df(self):
+        # Loaded on first use so streaming summaries never hold the whole file
+        if self._df is None:
+            self._df = self._load_data()
+        return self._df
 
     def _load_data(self):
-        if self.file_path.endswith('.csv'):
-            return pd.read_csv(self.file_path)
-        elif self.file_path.endswith('.xlsx'):
-            return pd.read_excel(self.file_path)
-        else:
-            raise ValueError("Unsupported file format")
+        if self.sample:
+            return dataframe_cache.get_or_load(self.cache_key, self.file_path, self._load_sample,
+                                               variant=('sample', self.sheet, self.compact, self._formats_key))
+        return dataframe_cache.get_or_load(self.cache_key, self.file_path,
+                                           lambda path: load_dataframe(path, compact=self.compact, sheet=self.sheet,
+                                                                       datetime_formats=self.datetime_formats),
+                                           variant=(self.sheet, 'compact' if self.compact else None, self._formats_key))
+
+    @property
+    def _formats_key(self):
+        return tuple(sorted((self.datetime_formats or {}).items()))
+
+    def _load_sample(self, path):
+        df = parse_datetime_columns(load_sample(path, self.sheet), self.datetime_formats)
+        if self.compact:
+            sample = df.attrs['sample']
+            df, _ = compact_dataframe(df)
+            df.attrs['sample'] = sample
+        return df
+
+    @property
+    def sample_info(self):
+        # {'rows', 'population_rows'} when working on a sample, otherwise None
+        return self.df.attrs.get('sample') if self.sample else None
+
+    @property
+    def memory_report(self):
+        # Per-column bytes saved by compact loading (empty when compact is off).
+        # Taken from whichever frame was loaded; never loads one just for the report.
+        frame = self._df if self._df is not None else self._projected
+        if not self.compact or frame is None:
+            return {}
+        return frame.attrs.get('memory_report', {})
 
     def get_summary_stats(self):
+        if self.streaming:
+            return self.get_streaming_summary_stats()
+
+        return self._summary(self._frame_with_datetimes())
+
+    def profile(self):
+        """Return (summary, accumulators): the summary statistics and the mergeable state behind them.
+
+        A frame that fits in memory gets the exact get_summary_stats()
+        figures; its accumulators are built from the same loaded frame and
+        also supply the distinct counts and top values. Only streaming
+        summaries take their quantiles from the sketches.
+        """
+        if self.streaming:
+            accumulators = self.streaming_summary()
+            summary = accumulators.result()
+            summary['datetime_formats'] = self.datetime_formats
+            return summary, accumulators
+
+        df = self._frame_with_datetimes()
+        accumulators = StreamingSummary()
+        accumulators.update(df)
+        return self._summary(df, accumulators.sketches()), accumulators
+
+    def _summary(self, df, sketches=None):
+        describe, missing_values = profile_frame(df)
+        cardinality, top_values = sketches or sketch_frame(df)
         return {
-            'describe': self.df.describe().to_dict(),
-            'dtypes': self.df.dtypes.astype(str).to_dict(),
-            'missing_values': self.df.isnull().sum().to_dict(),
-            'shape': self.df.shape,
-            'columns': list(self.df.columns)
+            'describe': describe,
+            'dtypes': df.dtypes.astype(str).to_dict(),
+            'missing_values': missing_values,
+            'shape': df.shape,
+            'columns': list(df.columns),
+            'cardinality': cardinality,
+            'top_values': top_values,
+            'datetime_formats': self.datetime_formats
         }
 
-    def generate_visualizations(self, columns):
-        visualizations = {}
+    def _frame_with_datetimes(self):
+        # Without cached formats, infer them from a sample of each text column
+        if self.datetime_formats is None:
+            self.datetime_formats = detect_datetime_formats(self.df)
+        # A no-op when the frame was loaded with these formats
+        return parse_datetime_columns(self.df, self.datetime_formats)
+
+    def get_streaming_summary_stats(self):
+        summary = self.streaming_summary().result()
+        summary['datetime_formats'] = self.datetime_formats
+        return summary
+
+    def streaming_summary(self):
+        """Mergeable accumulators for the whole dataset (read chunk by chunk unless already loaded)."""
+        summary = StreamingSummary()
+        if self._df is not None:
+            summary.update(self._frame_with_datetimes())
+            return summary
+        for chunk in iter_dataframe_chunks(self.file_path, self.chunksize, self.sheet):
+            if self.datetime_formats is None:
+                # Formats found in the first chunk apply to the rest
+                self.datetime_formats = detect_datetime_formats(chunk)
+            summary.update(parse_datetime_columns(chunk, self.datetime_formats))
+        return summary
 
+    def _projected_frame(self, columns):
+        # Reuse a frame that is already loaded; otherwise read only the requested
+        # columns plus the numeric ones the correlation heatmap needs.
+        if self._df is not None or self.sample:
+            return self.df
+
+        schema = read_schema(self.file_path, self.sheet)
+        if schema is None:
+            return self.df
+
+        wanted = [col for col, type_ in schema.items() if col in columns or is_numeric_type(type_)]
+        self._projected = dataframe_cache.get_or_load(self.cache_key, self.file_path,
+                                           lambda path: load_dataframe(path, compact=self.compact, columns=wanted,
+                                                                       sheet=self.sheet,
+                                                                       datetime_formats=self.datetime_formats),
+                                           variant=('projection', self.sheet, self.compact, tuple(wanted),
+                                                    self._formats_key))
+        return self._projected
+
+    def _chart_key(self, kind, *params):
+        # Same dataset content, view of it and chart parameters -> same image
+        if self.cache_key is None:
+            return None
+        return chart_cache.make_key(self.cache_key, self.sheet, self.sample, self._formats_key, kind, *params)
+
+    def _correlation(self, df, numeric_cols):
+        # Cached next to the dataset's frames, so the heatmap and the pairs table share one computation
+        return dataframe_cache.get_or_load(self.cache_key, self.file_path,
+                                           lambda path: correlation_matrix(df[numeric_cols]),
+                                           variant=('correlation', self.sheet, self.sample, self.compact,
+                                                    self._formats_key, tuple(numeric_cols)))
+
+    def _heatmap_args(self, df, numeric_cols):
+        view = heatmap_view(self._correlation(df, numeric_cols))
+        title = 'Correlation Heatmap'
+        if len(view) < len(numeric_cols):
+            title += f' (top {len(view)} of {len(numeric_cols)} columns by |r|, clustered)'
+        return view, title, len(view) <= ANNOTATE_COLUMNS
+
+    def correlation_pairs(self, columns, limit=TOP_PAIRS):
+        """The most strongly correlated numeric column pairs as ``(column, column, r)``, strongest first."""
+        df = self._projected_frame(columns)
+        numeric_cols = list(df.select_dtypes(include=np.number).columns)
+        if len(numeric_cols) < 2:
+            return []
+        return strongest_pairs(self._correlation(df, numeric_cols), limit)
+
+    def _category_counts(self, df, col, summary_stats):
+        # (labels, counts, other) for the top_k values; other counts every remaining non-null row
+        summary_stats = summary_stats or {}
+        top = summary_stats.get('top_values', {}).get(col)
+        cardinality = summary_stats.get('cardinality', {}).get(col, 0)
+        # The profile's sketch is enough unless more values are asked for than it holds.
+        # It counts the full dataset, so a sampled analysis counts its sample instead.
+        if not self.sample and top is not None and (len(top) >= self.top_k or cardinality <= len(top)):
+            top = top[:self.top_k]
+            labels = [label for label, _ in top]
+            counts = [count for _, count in top]
+            present = summary_stats['shape'][0] - summary_stats['missing_values'].get(col, 0)
+            # TopK counts can only be short (by at most its error), so the remainder is never
+            # negative; it may include a few rows of the values shown
+            return labels, counts, present - sum(counts)
+
+        # One counting pass gives both the top values and the remainder
+        value_counts = df[col].value_counts()
+        head = value_counts.head(self.top_k)
+        return [str(label) for label in head.index], head.tolist(), int(value_counts.iloc[self.top_k:].sum())
+
+    def generate_visualizations(self, columns, summary_stats=None):
+        # With the stored profile, chart types and category counts come from
+        # its cardinality and top-value sketches instead of rescanning columns
+        df = self._projected_frame(columns)
+        cardinality = (summary_stats or {}).get('cardinality', {})
+        top_values = (summary_stats or {}).get('top_values', {})
+
+        jobs = []
         for col in columns:
-            if col not in self.df.columns:
+            if col not in df.columns:
                 continue
 
             # Determine plot type based on data type
-            if np.issubdtype(self.df[col].dtype, np.number):
-                # Numeric data - histogram and boxplot
-                fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+            is_numeric = pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+            if is_numeric and col in top_values and cardinality.get(col, 0) <= LOW_CARDINALITY:
+                # A handful of distinct codes reads better as bars than as a histogram
+                is_numeric = False
 
-                # Histogram
-                sns.histplot(self.df[col], kde=True, ax=ax1)
-                ax1.set_title(f'Histogram of {col}')
+            # Only small precomputed aggregates go to the chart worker, never the raw column
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                jobs.append((f'{col}_distribution', charts.datetime_chart,
+                             lambda col=col, values=df[col]: (col, datetime_stats(datetime_to_seconds(values))),
+                             self._chart_key('datetime', col)))
 
-                # Boxplot
-                sns.boxplot(y=self.df[col], ax=ax2)
-                ax2.set_title(f'Boxplot of {col}')
-
-                plt.tight_layout()
-
-                # Save to base64
-                buf = BytesIO()
-                plt.savefig(buf, format='png', bbox_inches='tight')
-                plt.close()
-                visualizations[f'{col}_distribution'] = base64.b64encode(buf.getvalue()).decode('utf-8')
+            elif is_numeric:
+                jobs.append((f'{col}_distribution', charts.distribution_chart,
+                             lambda col=col, values=df[col]: (col, distribution_stats(values)),
+                             self._chart_key('distribution', col)))
 
             else:
-                # Categorical data - bar plot
-                plt.figure(figsize=(10, 6))
-                sns.countplot(y=self.df[col], order=self.df[col].value_counts().index)
-                plt.title(f'Distribution of {col}')
-                plt.tight_layout()
-
-                # Save to base64
-                buf = BytesIO()
-                plt.savefig(buf, format='png', bbox_inches='tight')
-                plt.close()
-                visualizations[f'{col}_distribution'] = base64.b64encode(buf.getvalue()).decode('utf-8')
+                # Categorical data - bar plot of the most frequent values
+                labels, counts, other = self._category_counts(df, col, summary_stats)
+                title = f'Distribution of {col}'
+                if cardinality.get(col, 0) > len(labels):
+                    title += f' (top {len(labels)} of ~{cardinality[col]})'
+                if other > 0:
+                    labels, counts = labels + ['Other'], counts + [other]
+                jobs.append((f'{col}_distribution', charts.category_chart, (title, labels, counts),
+                             self._chart_key('category', col, title, labels, counts)))
 
         # Correlation heatmap if multiple numeric columns
-        numeric_cols = self.df.select_dtypes(include=np.number).columns
+        numeric_cols = list(df.select_dtypes(include=np.number).columns)
         if len(numeric_cols) > 1:
-            plt.figure(figsize=(10, 8))
-            sns.heatmap(self.df[numeric_cols].corr(), annot=True, cmap='coolwarm', center=0)
-            plt.title('Correlation Heatmap')
-            plt.tight_layout()
-
-            buf = BytesIO()
-            plt.savefig(buf, format='png', bbox_inches='tight')
-            plt.close()
-            visualizations['correlation_heatmap'] = base64.b64encode(buf.getvalue()).decode('utf-8')
+            jobs.append(('correlation_heatmap', charts.heatmap_chart, lambda: self._heatmap_args(df, numeric_cols),
+                         self._chart_key('correlation', tuple(numeric_cols))))
 
+        # Charts are independent, so they render in parallel; cached ones are not redrawn
+        visualizations = chart_renderer.render(jobs)
         return visualizations
\ No newline at end of file
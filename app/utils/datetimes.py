@@ -0,0 +1,73 @@
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+SAMPLE_SIZE = 200
+# Share of sampled values a format has to parse before a column counts as a date
+MIN_PARSED_RATIO = 0.95
+# Tried when pandas cannot guess a format from the first value
+CANDIDATE_FORMATS = (
+    '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M',
+    '%d/%m/%Y', '%m/%d/%Y', '%d/%m/%Y %H:%M', '%m/%d/%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%m/%d/%Y %H:%M:%S',
+    '%Y/%m/%d', '%d-%m-%Y', '%d.%m.%Y', '%d %b %Y', '%b %d, %Y'
+)
+
+
+def _sample(series, size=SAMPLE_SIZE):
+    # Evenly spaced non-null values, so sorted files are sampled end to end
+    values = series.dropna()
+    step = max(len(values) // size, 1)
+    return values.iloc[::step].iloc[:size].astype(str)
+
+
+def _parses(sample, fmt):
+    return pd.to_datetime(sample, format=fmt, errors='coerce').notna().mean() >= MIN_PARSED_RATIO
+
+
+def infer_datetime_format(series, sample_size=SAMPLE_SIZE):
+    """Return a strftime format that parses the text column, or None if it is not a date."""
+    if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        return None
+    sample = _sample(series, sample_size)
+    # Plain numbers (ids, years) are not dates; require a date/time separator
+    if not len(sample) or not sample.str.contains(r'[-/.:\s]', regex=True).all():
+        return None
+
+    guesses = [guess_datetime_format(sample.iloc[0], dayfirst=dayfirst) for dayfirst in (False, True)]
+    for fmt in dict.fromkeys([guess for guess in guesses if guess] + list(CANDIDATE_FORMATS)):
+        if _parses(sample, fmt):
+            return fmt
+    return None
+
+
+def detect_datetime_formats(df):
+    """Map each text column that holds dates to the format that parses it."""
+    formats = {}
+    for col in df.columns:
+        fmt = infer_datetime_format(df[col])
+        if fmt is not None:
+            formats[col] = fmt
+    return formats
+
+
+def parse_datetime_columns(df, formats):
+    """Return ``df`` with the given columns parsed as datetimes (one vectorized call per column).
+
+    Values that do not match the column's format become NaT. The input
+    frame is not modified.
+    """
+    formats = {col: fmt for col, fmt in (formats or {}).items()
+               if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col])}
+    if not formats:
+        return df
+    # Shallow copy: untouched columns are shared, parsed ones replaced
+    df = df.copy(deep=False)
+    for col, fmt in formats.items():
+        df[col] = pd.to_datetime(df[col], format=fmt, errors='coerce')
+    return df
+
+
+def datetime_to_seconds(series):
+    """Seconds since the epoch as floats (NaT becomes NaN), for models that need numbers."""
+    if series.dt.tz is not None:
+        series = series.dt.tz_convert(None)
+    return (series - pd.Timestamp('1970-01-01')) / pd.Timedelta(seconds=1)
@@ -0,0 +1,89 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class DataFrameCache:
+    """Process-level LRU cache of loaded DataFrames, bounded by total bytes.
+
+    Entries are keyed by the caller's key (the DataFile id) plus the file's
+    mtime and size, so a replaced file is never served stale. Cached frames
+    are shared between requests and must not be modified in place.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_bytes = app.config.get('DATAFRAME_CACHE_MAX_BYTES', self.max_bytes)
+
+    @staticmethod
+    def make_key(cache_key, file_path, variant=None):
+        stat = os.stat(file_path)
+        return (cache_key, stat.st_mtime_ns, stat.st_size, variant)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, df):
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+
+            # Frames larger than the whole budget are served but never cached
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (df, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_load(self, cache_key, file_path, loader, variant=None):
+        if cache_key is None or not self.max_bytes:
+            return loader(file_path)
+
+        key = self.make_key(cache_key, file_path, variant)
+        df = self.get(key)
+        if df is None:
+            df = loader(file_path)
+            self.put(key, df)
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'pid': os.getpid(),
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+dataframe_cache = DataFrameCache()
@@ -6,27 +6,49 @@ from sklearn.tree import DecisionTreeRegressor
 from sklearn.ensemble import RandomForestRegressor
 from xgboost import XGBRegressor
 from sklearn.metrics import mean_squared_error, r2_score
-import seaborn as sns
-from io import BytesIO
-import matplotlib
-matplotlib.use('Agg')  # Use non-GUI backend
-import matplotlib.pyplot as plt
-import base64
+import hashlib
 import json
+from app.utils import charts
+from app.utils.charts import chart_renderer
+from app.utils.chart_cache import chart_cache
+from app.utils.chart_stats import density_grid, stratified_sample
+from app.utils.columnar import load_dataframe
+from app.utils.frame_cache import dataframe_cache
+from app.utils.datetimes import datetime_to_seconds
+
+# How Actual vs Predicted is drawn once the test set exceeds max_points
+SCATTER_MODES = ('density', 'sample')
 
 
 class MLPredictor:
-    def __init__(self, file_path):
+    def __init__(self, file_path, cache_key=None, compact=False, sheet=None, datetime_formats=None,
+                 max_points=50_000, scatter_mode='density'):
+        if scatter_mode not in SCATTER_MODES:
+            raise ValueError(f"Unknown scatter mode {scatter_mode!r}, expected one of {', '.join(SCATTER_MODES)}")
         self.file_path = file_path
+        self.cache_key = cache_key
+        self.compact = compact
+        self.sheet = sheet
+        # {column: format} from the stored profile
+        self.datetime_formats = datetime_formats
+        # Test sets larger than this are drawn as a density plot or a stratified sample
+        self.max_points = max_points
+        self.scatter_mode = scatter_mode
         self.df = self._load_data()
 
     def _load_data(self):
-        if self.file_path.endswith('.csv'):
-            return pd.read_csv(self.file_path)
-        elif self.file_path.endswith('.xlsx'):
-            return pd.read_excel(self.file_path)
-        else:
-            raise ValueError("Unsupported file format")
+        return dataframe_cache.get_or_load(self.cache_key, self.file_path,
+                                           lambda path: load_dataframe(path, compact=self.compact, sheet=self.sheet,
+                                                                       datetime_formats=self.datetime_formats),
+                                           variant=(self.sheet, 'compact' if self.compact else None,
+                                                    tuple(sorted((self.datetime_formats or {}).items()))))
+
+    @property
+    def memory_report(self):
+        # Per-column bytes saved by compact loading (empty when compact is off)
+        if not self.compact:
+            return {}
+        return self.df.attrs.get('memory_report', {})
 
     def prepare_data(self, target_column, test_size=0.2, random_state=42):
         if target_column not in self.df.columns:
@@ -39,6 +61,10 @@ class MLPredictor:
         X = self.df.drop(columns=[target_column])
         y = self.df[target_column]
 
+        # Dates become one numeric feature each instead of a dummy column per timestamp
+        for col in X.select_dtypes(include=['datetime', 'datetimetz']).columns:
+            X[col] = datetime_to_seconds(X[col])
+
         # Convert categorical variables to dummy variables
         X = pd.get_dummies(X)
 
@@ -75,32 +101,38 @@ class MLPredictor:
 
         return metrics, y_pred
 
-    def generate_visualizations(self, model, X_test, y_test, y_pred, target_column):
-        visualizations = {}
+    def _chart_key(self, kind, *arrays):
+        # Keyed by the plotted values themselves: retraining may not reproduce the same predictions
+        if self.cache_key is None:
+            return None
+        digest = hashlib.sha256()
+        for values in arrays:
+            digest.update(np.ascontiguousarray(values, dtype=float).tobytes())
+        return chart_cache.make_key(self.cache_key, self.sheet, kind, digest.hexdigest())
+
+    def _actual_vs_predicted_job(self, y_test, y_pred, target_column):
+        key = self._chart_key(('actual_vs_predicted', target_column, self.max_points, self.scatter_mode),
+                              y_test, y_pred)
+        if len(y_test) <= self.max_points:
+            return 'actual_vs_predicted', charts.actual_vs_predicted_chart, (target_column, y_test, y_pred), key
+
+        # Only the grid or the sample goes to the chart worker, and only when the chart is not cached
+        if self.scatter_mode == 'sample':
+            def args():
+                x, y = stratified_sample(y_test, y_pred, self.max_points)
+                title = f'Actual vs Predicted {target_column} (stratified sample of {len(x):,} of {len(y_test):,} rows)'
+                return target_column, x, y, title
+            return 'actual_vs_predicted', charts.actual_vs_predicted_chart, args, key
+        return ('actual_vs_predicted', charts.actual_vs_predicted_density_chart,
+                lambda: (target_column, *density_grid(y_test, y_pred)), key)
 
-        # Actual vs Predicted plot
-        plt.figure(figsize=(10, 6))
-        plt.scatter(y_test, y_pred, alpha=0.5)
-        plt.plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], 'k--', lw=2)
-        plt.xlabel('Actual')
-        plt.ylabel('Predicted')
-        plt.title(f'Actual vs Predicted {target_column}')
-
-        buf = BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight')
-        plt.close()
-        visualizations['actual_vs_predicted'] = base64.b64encode(buf.getvalue()).decode('utf-8')
+    def generate_visualizations(self, model, X_test, y_test, y_pred, target_column):
+        jobs = [self._actual_vs_predicted_job(y_test, y_pred, target_column)]
 
         # Feature importance if available
         if hasattr(model, 'feature_importances_'):
-            plt.figure(figsize=(10, 6))
-            feature_imp = pd.Series(model.feature_importances_, index=X_test.columns)
-            feature_imp.nlargest(10).plot(kind='barh')
-            plt.title('Top 10 Feature Importance')
-
-            buf = BytesIO()
-            plt.savefig(buf, format='png', bbox_inches='tight')
-            plt.close()
-            visualizations['feature_importance'] = base64.b64encode(buf.getvalue()).decode('utf-8')
+            jobs.append(('feature_importance', charts.feature_importance_chart,
+                         (model.feature_importances_, list(X_test.columns)),
+                         self._chart_key(('feature_importance', tuple(X_test.columns)), model.feature_importances_)))
 
-        return visualizations
\ No newline at end of file
+        return chart_renderer.render(jobs)
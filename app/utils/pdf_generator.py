@@ -5,7 +5,8 @@ from datetime import datetime
 
 class PDFGenerator:
     @staticmethod
-    def generate_analysis_report(summary_stats, visualizations, output_path=None):
+    def generate_analysis_report(summary_stats, visualizations, output_path=None, sample_info=None,
+                                 correlation_pairs=None):
         # Create HTML content
         html_content = f"""
         <!DOCTYPE html>
@@ -142,11 +143,44 @@ class PDFGenerator:
         html_content += """
                 </table>
             </div>
+        """
 
+        # Ranked pairs stay readable however many columns the heatmap had to leave out
+        if correlation_pairs:
+            html_content += """
+            <div class="section">
+                <h2>Strongest Correlations</h2>
+                <table>
+                    <tr>
+                        <th>Column</th>
+                        <th>Column</th>
+                        <th>Correlation (r)</th>
+                    </tr>
+            """
+            for first, second, r in correlation_pairs:
+                html_content += f"""
+                    <tr>
+                        <td>{first}</td>
+                        <td>{second}</td>
+                        <td>{r:.3f}</td>
+                    </tr>
+                """
+            html_content += """
+                </table>
+            </div>
+            """
+
+        html_content += """
             <div class="section">
                 <h2>Data Visualizations</h2>
         """
 
+        if sample_info:
+            html_content += f"""
+                <p><em>Charts were built from a uniform random sample of {sample_info['rows']:,} of
+                {sample_info['population_rows']:,} rows. Summary statistics above cover the full dataset.</em></p>
+            """
+
         # Add visualizations
         for name, img_data in visualizations.items():
             html_content += f"""
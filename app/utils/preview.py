@@ -0,0 +1,66 @@
+import os
+import openpyxl
+import pandas as pd
+from app.utils.csv_reader import is_csv, open_csv, sniff_csv, SNIFF_BYTES
+from app.utils.columnar import header_names
+
+
+def _estimate_rows(file_path, head):
+    # Average row width in the head spread over the file size; unknown for compressed files
+    if not file_path.endswith('.csv'):
+        return None
+    size = os.path.getsize(file_path)
+    header_end = head.find(b'\n') + 1
+    if not header_end:
+        return 0 if len(head) >= size else None
+    if len(head) >= size:
+        # The whole file fits in the head, so count exactly
+        body = head[header_end:]
+        return body.count(b'\n') + (1 if body and not body.endswith(b'\n') else 0)
+    rows_in_head = head.count(b'\n', header_end)
+    if not rows_in_head:
+        return None
+    return int(round((size - header_end) * rows_in_head / (head.rfind(b'\n') + 1 - header_end)))
+
+
+def _preview_csv(file_path, rows):
+    with open_csv(file_path) as stream:
+        head = stream.read(SNIFF_BYTES)
+    encoding, delimiter = sniff_csv(head)
+    with open_csv(file_path) as stream:
+        df = pd.read_csv(stream, sep=delimiter, nrows=rows, encoding=encoding, encoding_errors='replace')
+    return df, {'encoding': encoding, 'delimiter': delimiter, 'estimated_rows': _estimate_rows(file_path, head)}
+
+
+def _preview_xlsx(file_path, rows):
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        values = sheet.iter_rows(values_only=True, max_row=rows + 1)
+        header = next(values, None)
+        if header is None:
+            return pd.DataFrame(), {'estimated_rows': 0}
+        columns = header_names(header)
+        df = pd.DataFrame.from_records([row[:len(columns)] for row in values], columns=columns).infer_objects()
+        # The sheet's stored dimension gives the row count without reading the rows
+        estimated = sheet.max_row - 1 if sheet.max_row else None
+    finally:
+        workbook.close()
+    return df, {'estimated_rows': estimated}
+
+
+def preview_file(file_path, rows=20):
+    """Read only the head of an upload: (first ``rows`` rows, info dict).
+
+    ``info`` holds the inferred ``dtypes``, an ``estimated_rows`` figure
+    (None when it cannot be guessed) and, for CSVs, the sniffed
+    ``encoding`` and ``delimiter``.
+    """
+    if is_csv(file_path):
+        df, info = _preview_csv(file_path, rows)
+    elif file_path.endswith('.xlsx'):
+        df, info = _preview_xlsx(file_path, rows)
+    else:
+        raise ValueError("Unsupported file format")
+    info['dtypes'] = df.dtypes.astype(str).to_dict()
+    return df, info
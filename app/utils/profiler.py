@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+from app.utils.sketches import HyperLogLog, TopK
+
+TOP_VALUES = 20
+# Numeric columns with more distinct values than this are charted as distributions, so no top values
+MAX_NUMERIC_CARDINALITY = 1000
+
+
+def _is_numeric(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def _numeric_block(df, columns):
+    # Column-major so every column is one contiguous run for the sort below
+    block = np.empty((len(df), len(columns)), dtype=np.float64, order='F')
+    for i, col in enumerate(columns):
+        block[:, i] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+    return block
+
+
+def describe_numeric(block):
+    """describe()-equivalent statistics for every column of a 2-D float block.
+
+    One sort per column (NaNs sort last) yields count, min, max and the
+    linearly interpolated quartiles; mean and std come from two vectorized
+    reductions over the same block.
+    """
+    n_rows, n_cols = block.shape
+    ordered = np.sort(block, axis=0)
+    valid = ~np.isnan(block)
+    count = valid.sum(axis=0)
+    has_values = count > 0
+    cols = np.arange(n_cols)
+
+    def quantile(q):
+        position = np.maximum(count - 1, 0) * q
+        lower = np.floor(position).astype(int)
+        upper = np.ceil(position).astype(int)
+        if n_rows == 0:
+            return np.full(n_cols, np.nan)
+        low, high = ordered[lower, cols], ordered[upper, cols]
+        return np.where(has_values, low + (high - low) * (position - lower), np.nan)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        filled = np.where(valid, block, 0.0)
+        mean = filled.sum(axis=0) / count
+        deviations = np.where(valid, block - mean, 0.0)
+        std = np.sqrt((deviations ** 2).sum(axis=0) / (count - 1))
+    std = np.where(count > 1, std, np.nan)
+    mean = np.where(has_values, mean, np.nan)
+
+    return {
+        'count': count.astype(float),
+        'mean': mean,
+        'std': std,
+        'min': quantile(0.0),
+        '25%': quantile(0.25),
+        '50%': quantile(0.5),
+        '75%': quantile(0.75),
+        'max': quantile(1.0)
+    }
+
+
+def profile_frame(df):
+    """Return (describe, missing_values) dicts shaped like the pandas ones.
+
+    Numeric columns are profiled together in one block, and their null
+    counts fall out of the same pass; only non-numeric columns need a
+    separate isnull() scan.
+    """
+    numeric = [col for col in df.columns if _is_numeric(df[col])]
+    missing = {}
+
+    if not numeric:
+        # Match pandas, which describes text columns when there are no numeric ones
+        describe = df.describe().to_dict() if len(df.columns) else {}
+    else:
+        stats = describe_numeric(_numeric_block(df, numeric))
+        describe = {
+            col: {name: float(values[i]) for name, values in stats.items()}
+            for i, col in enumerate(numeric)
+        }
+        for i, col in enumerate(numeric):
+            missing[col] = len(df) - int(stats['count'][i])
+
+    for col in df.columns:
+        if col not in missing:
+            missing[col] = int(df[col].isnull().sum())
+
+    return describe, {col: missing[col] for col in df.columns}
+
+
+def top_values_list(counter, k=TOP_VALUES):
+    # JSON-friendly [[label, count], ...] pairs, most frequent first
+    return [[str(value), int(count)] for value, count in counter.top(k)]
+
+
+def sketch_frame(df, top_k=TOP_VALUES):
+    """Approximate distinct counts (HyperLogLog) and top values per column."""
+    cardinality = {}
+    top_values = {}
+    for col in df.columns:
+        hll = HyperLogLog()
+        hll.update(df[col])
+        cardinality[col] = hll.count()
+
+        if _is_numeric(df[col]) and cardinality[col] > MAX_NUMERIC_CARDINALITY:
+            continue
+        counter = TopK(top_k)
+        counter.update(df[col])
+        top_values[col] = top_values_list(counter, top_k)
+    return cardinality, top_values
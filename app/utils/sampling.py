@@ -0,0 +1,88 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+from app.utils.columnar import iter_dataframe_chunks, sample_path, write_table, arrow_safe, to_arrow_table, to_pandas
+
+
+class ReservoirSample:
+    """Uniform random sample of at most ``size`` rows from a stream of chunks.
+
+    Algorithm R, vectorized per chunk: row ``i`` (0-based, over the whole
+    stream) replaces a random reservoir slot with probability size / (i + 1).
+    """
+
+    def __init__(self, size, seed=None):
+        self.size = size
+        self.rows = 0
+        self.frame = None
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def resume(cls, frame, population_rows, size, seed=None):
+        """Continue sampling from a persisted sample of ``population_rows`` rows."""
+        reservoir = cls(size, seed)
+        reservoir.frame = frame.iloc[:size].reset_index(drop=True)
+        reservoir.rows = population_rows
+        return reservoir
+
+    def update(self, chunk):
+        n = len(chunk)
+        if not n:
+            return
+        if self.frame is None:
+            self.frame = chunk.iloc[:0]
+
+        # Fill phase: the first ``size`` rows are all kept
+        fill = min(max(self.size - len(self.frame), 0), n)
+        if fill:
+            self.frame = pd.concat([self.frame, chunk.iloc[:fill]], ignore_index=True)
+
+        if fill < n:
+            positions = np.arange(self.rows + fill, self.rows + n)
+            slots = self._rng.integers(0, positions + 1)
+            accepted = np.flatnonzero(slots < self.size) + fill
+            if len(accepted):
+                slots = slots[accepted - fill]
+                # Several rows may land on one slot; as in the sequential algorithm the last one wins
+                _, last = np.unique(slots[::-1], return_index=True)
+                keep = len(slots) - 1 - last
+                evicted = np.zeros(len(self.frame), dtype=bool)
+                evicted[slots[keep]] = True
+                self.frame = pd.concat([self.frame[~evicted], chunk.iloc[accepted[keep]]], ignore_index=True)
+
+        self.rows += n
+
+
+def build_sample(file_path, size, chunksize=100_000, sheet=None):
+    """Stream the dataset once and persist a uniform reservoir sample next to it.
+
+    The population row count is stored in the sample's schema metadata.
+    """
+    reservoir = ReservoirSample(size)
+    for chunk in iter_dataframe_chunks(file_path, chunksize, sheet):
+        reservoir.update(chunk)
+    return save_sample(reservoir, file_path, sheet)
+
+
+def save_sample(reservoir, file_path, sheet=None):
+    if reservoir.frame is None:
+        return None
+    table = to_arrow_table(arrow_safe(reservoir.frame))
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           b'population_rows': str(reservoir.rows).encode()})
+    return write_table(table, sample_path(file_path, sheet))
+
+
+def has_sample(file_path, sheet=None):
+    path = sample_path(file_path, sheet)
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(file_path)
+
+
+def load_sample(file_path, sheet=None):
+    """Return the persisted sample with ``df.attrs['sample']`` = {'rows', 'population_rows'}."""
+    table = feather.read_table(sample_path(file_path, sheet), memory_map=True)
+    population = int((table.schema.metadata or {}).get(b'population_rows', table.num_rows))
+    df = to_pandas(table)
+    df.attrs['sample'] = {'rows': len(df), 'population_rows': population}
+    return df
@@ -0,0 +1,202 @@
+import base64
+import numpy as np
+import pandas as pd
+
+
+def _plain(value):
+    # JSON-friendly form of a counted value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class QuantileSketch:
+    """Mergeable approximate quantile sketch (a compact merging t-digest).
+
+    Values are kept as weighted centroids. Whenever the number of centroids
+    grows past ``max_centroids`` neighbours are merged, with smaller
+    centroids near the tails so extreme quantiles stay accurate.
+    """
+
+    def __init__(self, max_centroids=200):
+        self.max_centroids = max_centroids
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._absorb(values, np.ones(len(values)))
+
+    def merge(self, other):
+        if not len(other.means):
+            return
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._absorb(other.means, other.weights)
+
+    def _absorb(self, means, weights):
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind='mergesort')
+        self.means, self.weights = means[order], weights[order]
+        if len(self.means) > self.max_centroids:
+            self._compress()
+
+    def _compress(self):
+        cumulative = np.cumsum(self.weights)
+        q = (cumulative - self.weights / 2) / cumulative[-1]
+
+        # t-digest k1 scale function: buckets are narrow at the tails, wide in the middle
+        k = np.arcsin(2 * q - 1) / np.pi + 0.5
+        buckets = np.minimum((k * self.max_centroids).astype(int), self.max_centroids - 1)
+
+        weights = np.bincount(buckets, weights=self.weights, minlength=self.max_centroids)
+        sums = np.bincount(buckets, weights=self.means * self.weights, minlength=self.max_centroids)
+        keep = weights > 0
+        self.weights = weights[keep]
+        self.means = sums[keep] / self.weights
+
+    def to_state(self):
+        return {'max_centroids': self.max_centroids, 'means': self.means.tolist(),
+                'weights': self.weights.tolist(), 'min': float(self.min), 'max': float(self.max)}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['max_centroids'])
+        sketch.means = np.asarray(state['means'], dtype=float)
+        sketch.weights = np.asarray(state['weights'], dtype=float)
+        sketch.min, sketch.max = state['min'], state['max']
+        return sketch
+
+    def quantile(self, q):
+        if not len(self.means):
+            return np.nan
+        cumulative = np.cumsum(self.weights)
+        total = cumulative[-1]
+        positions = np.concatenate([[0.0], cumulative - self.weights / 2, [total]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return float(np.interp(q * total, positions, values))
+
+
+def hash_values(series):
+    """64-bit hashes of a Series' non-null values (equal values hash equally across chunks).
+
+    Numbers are hashed in a canonical form: integers as int64 and whole
+    floats as the equal int64. A chunk read as float because of a missing
+    value therefore hashes 3.0 like an int chunk's 3.
+    """
+    values = series.dropna()
+    if pd.api.types.is_bool_dtype(values) or not pd.api.types.is_numeric_dtype(values):
+        return pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+    if pd.api.types.is_integer_dtype(values):
+        return pd.util.hash_array(values.to_numpy(dtype=np.int64))
+
+    floats = values.to_numpy(dtype=np.float64)
+    whole = (floats == np.floor(floats)) & (np.abs(floats) < 2.0 ** 63)
+    hashes = np.empty(len(floats), dtype=np.uint64)
+    hashes[whole] = pd.util.hash_array(floats[whole].astype(np.int64))
+    hashes[~whole] = pd.util.hash_array(floats[~whole])
+    return hashes
+
+
+class HyperLogLog:
+    """Approximate distinct counter; ``precision`` 12 gives about 1.6% standard error."""
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, series):
+        hashes = hash_values(series)
+        if not len(hashes):
+            return
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.intp)
+        remainder = hashes & np.uint64((1 << width) - 1)
+
+        # Rank = position of the leftmost 1-bit in the remaining bits
+        bit_length = np.zeros(len(remainder), dtype=np.int64)
+        nonzero = remainder > 0
+        bit_length[nonzero] = np.floor(np.log2(remainder[nonzero].astype(np.float64))).astype(np.int64) + 1
+        rank = (width - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def to_state(self):
+        return {'precision': self.precision, 'registers': base64.b64encode(self.registers.tobytes()).decode('ascii')}
+
+    @classmethod
+    def from_state(cls, state):
+        hll = cls(state['precision'])
+        hll.registers = np.frombuffer(base64.b64decode(state['registers']), dtype=np.uint8).copy()
+        return hll
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class TopK:
+    """Mergeable heavy-hitter counts that keep at most ``capacity`` values.
+
+    Counts are exact until values are dropped; after that every kept count
+    may be short by at most ``error``.
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.counts = {}
+        self.error = 0
+
+    def update(self, series):
+        self._absorb(series.value_counts(dropna=True).items())
+
+    def merge(self, other):
+        self._absorb(other.counts.items())
+        self.error = max(self.error, other.error)
+
+    def _absorb(self, items):
+        for value, count in items:
+            # Keyed by the stored form, so counts restored by from_state match new values
+            value = _plain(value)
+            self.counts[value] = self.counts.get(value, 0) + int(count)
+        if len(self.counts) > self.capacity:
+            ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+            self.error = max(self.error, ranked[self.capacity][1])
+            self.counts = dict(ranked[:self.capacity])
+
+    def to_state(self):
+        return {'capacity': self.capacity, 'error': self.error,
+                'counts': [[value, count] for value, count in self.counts.items()]}
+
+    @classmethod
+    def from_state(cls, state):
+        counter = cls(state['capacity'])
+        counter.error = state['error']
+        counter.counts = {value: count for value, count in state['counts']}
+        return counter
+
+    def top(self, k=None):
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:k] if k else ranked
@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+from app.utils.sketches import QuantileSketch, HyperLogLog, TopK
+from app.utils.profiler import TOP_VALUES, MAX_NUMERIC_CARDINALITY, top_values_list
+
+
+class RunningMoments:
+    """Count, mean and sum of squared deviations, merged with Chan's parallel update."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        other = RunningMoments()
+        other.count = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.min = float(values.min())
+        other.max = float(values.max())
+        self.merge(other)
+
+    def merge(self, other):
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else np.nan
+
+    def to_state(self):
+        return [self.count, self.mean, self.m2, float(self.min), float(self.max)]
+
+    @classmethod
+    def from_state(cls, state):
+        moments = cls()
+        moments.count, moments.mean, moments.m2, moments.min, moments.max = state
+        return moments
+
+
+def _is_numeric(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def _restore_dtype(name):
+    try:
+        return pd.api.types.pandas_dtype(name)
+    except TypeError:
+        return np.dtype(object)
+
+
+def _combine_dtypes(current, new):
+    if current is None or current == new:
+        return new
+    if pd.api.types.is_numeric_dtype(current) and pd.api.types.is_numeric_dtype(new):
+        try:
+            return np.result_type(current, new)
+        except TypeError:
+            pass
+    return np.dtype(object)
+
+
+class StreamingSummary:
+    """Builds the get_summary_stats() dictionary from DataFrame chunks.
+
+    Only per-column accumulators are kept in memory, so the file being
+    summarised never has to fit in RAM.
+    """
+
+    def __init__(self, max_centroids=200):
+        self.max_centroids = max_centroids
+        self.columns = []
+        self.rows = 0
+        self.dtypes = {}
+        self.missing = {}
+        self.moments = {}
+        self.sketches = {}
+        self.distinct = {}
+        self.heavy_hitters = {}
+        self.non_numeric = set()
+
+    def update(self, chunk):
+        if not self.columns:
+            self.columns = list(chunk.columns)
+
+        self.rows += len(chunk)
+        nulls = chunk.isnull().sum()
+
+        for col in chunk.columns:
+            series = chunk[col]
+            self.missing[col] = self.missing.get(col, 0) + int(nulls[col])
+
+            # An all-null chunk says nothing about the column's real type
+            if nulls[col] == len(series):
+                continue
+
+            hll = self.distinct.setdefault(col, HyperLogLog())
+            hll.update(series)
+            if col in self.non_numeric or not _is_numeric(series) or hll.count() <= MAX_NUMERIC_CARDINALITY:
+                # Oversized capacity so values near the top-K cut survive chunk merges
+                self.heavy_hitters.setdefault(col, TopK(TOP_VALUES * 4)).update(series)
+            else:
+                self.heavy_hitters.pop(col, None)
+
+            self.dtypes[col] = _combine_dtypes(self.dtypes.get(col), series.dtype)
+            if not _is_numeric(series):
+                self.non_numeric.add(col)
+                continue
+
+            values = series.to_numpy(dtype=float, na_value=np.nan)
+            self.moments.setdefault(col, RunningMoments()).update(values)
+            self.sketches.setdefault(col, QuantileSketch(self.max_centroids)).update(values)
+
+    def merge(self, other):
+        for col in other.columns:
+            if col not in self.columns:
+                self.columns.append(col)
+        self.rows += other.rows
+        for col, count in other.missing.items():
+            self.missing[col] = self.missing.get(col, 0) + count
+        for col, dtype in other.dtypes.items():
+            self.dtypes[col] = _combine_dtypes(self.dtypes.get(col), dtype)
+        for col, moments in other.moments.items():
+            self.moments.setdefault(col, RunningMoments()).merge(moments)
+        for col, sketch in other.sketches.items():
+            self.sketches.setdefault(col, QuantileSketch(self.max_centroids)).merge(sketch)
+        for col, hll in other.distinct.items():
+            self.distinct.setdefault(col, HyperLogLog()).merge(hll)
+        for col, counter in other.heavy_hitters.items():
+            self.heavy_hitters.setdefault(col, TopK(TOP_VALUES * 4)).merge(counter)
+        self.non_numeric |= other.non_numeric
+
+    def to_state(self):
+        """JSON-friendly accumulator state; ``from_state`` resumes it so more chunks can be added later."""
+        return {
+            'max_centroids': self.max_centroids,
+            'columns': list(self.columns),
+            'rows': self.rows,
+            'dtypes': {col: str(dtype) for col, dtype in self.dtypes.items()},
+            'missing': dict(self.missing),
+            'moments': {col: moments.to_state() for col, moments in self.moments.items()},
+            'sketches': {col: sketch.to_state() for col, sketch in self.sketches.items()},
+            'distinct': {col: hll.to_state() for col, hll in self.distinct.items()},
+            'heavy_hitters': {col: counter.to_state() for col, counter in self.heavy_hitters.items()},
+            'non_numeric': sorted(self.non_numeric)
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        summary = cls(state['max_centroids'])
+        summary.columns = list(state['columns'])
+        summary.rows = state['rows']
+        summary.dtypes = {col: _restore_dtype(name) for col, name in state['dtypes'].items()}
+        summary.missing = dict(state['missing'])
+        summary.moments = {col: RunningMoments.from_state(s) for col, s in state['moments'].items()}
+        summary.sketches = {col: QuantileSketch.from_state(s) for col, s in state['sketches'].items()}
+        summary.distinct = {col: HyperLogLog.from_state(s) for col, s in state['distinct'].items()}
+        summary.heavy_hitters = {col: TopK.from_state(s) for col, s in state['heavy_hitters'].items()}
+        summary.non_numeric = set(state['non_numeric'])
+        return summary
+
+    def _describe(self):
+        describe = {}
+        for col in self.columns:
+            if col in self.non_numeric or col not in self.moments:
+                continue
+            moments = self.moments[col]
+            sketch = self.sketches[col]
+            describe[col] = {
+                'count': float(moments.count),
+                'mean': moments.mean,
+                'std': moments.std,
+                'min': moments.min,
+                '25%': sketch.quantile(0.25),
+                '50%': sketch.quantile(0.5),
+                '75%': sketch.quantile(0.75),
+                'max': moments.max
+            }
+        return describe
+
+    def sketches(self):
+        """(cardinality, top_values) in the form sketch_frame returns."""
+        cardinality = {col: self.distinct[col].count() if col in self.distinct else 0 for col in self.columns}
+        top_values = {col: top_values_list(counter) for col, counter in self.heavy_hitters.items()}
+        return cardinality, top_values
+
+    def result(self):
+        cardinality, top_values = self.sketches()
+        return {
+            'describe': self._describe(),
+            'dtypes': {col: str(self.dtypes.get(col, np.dtype(float))) for col in self.columns},
+            'missing_values': {col: self.missing.get(col, 0) for col in self.columns},
+            'shape': (self.rows, len(self.columns)),
+            'columns': list(self.columns),
+            'cardinality': cardinality,
+            'top_values': top_values
+        }
@@ -8,5 +8,24 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'app/uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload size
-    ALLOWED_EXTENSIONS = {'csv', 'xlsx'}
\ No newline at end of file
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 1024 * 1024 * 1024))  # 1GB; uploads stream to disk
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))  # part size for chunked uploads
+    UPLOAD_EXPIRY_SECONDS = int(os.getenv('UPLOAD_EXPIRY_SECONDS', 24 * 60 * 60))  # unfinished chunked uploads
+    ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'csv.gz', 'csv.zst', 'csv.zip', 'zip'}  # compressed CSVs inflate while parsed
+    DATAFRAME_CACHE_MAX_BYTES = int(os.getenv('DATAFRAME_CACHE_MAX_BYTES', 512 * 1024 * 1024))  # per worker
+    STREAMING_STATS_THRESHOLD_BYTES = int(os.getenv('STREAMING_STATS_THRESHOLD_BYTES', 1024 * 1024 * 1024))
+    STREAMING_CHUNK_ROWS = int(os.getenv('STREAMING_CHUNK_ROWS', 100_000))
+    PREVIEW_ROWS = int(os.getenv('PREVIEW_ROWS', 20))  # rows shown right after upload
+    SAMPLE_THRESHOLD_BYTES = int(os.getenv('SAMPLE_THRESHOLD_BYTES', 256 * 1024 * 1024))  # larger uploads get a sample
+    SAMPLE_ROWS = int(os.getenv('SAMPLE_ROWS', 100_000))  # reservoir sample size for interactive analysis
+    CSV_ENGINE = os.getenv('CSV_ENGINE', 'pyarrow')  # 'pyarrow' (multi-threaded) or 'pandas'
+    CSV_READ_THREADS = int(os.getenv('CSV_READ_THREADS', 0)) or None  # None uses every core
+    CSV_BLOCK_SIZE = int(os.getenv('CSV_BLOCK_SIZE', 16 * 1024 * 1024))  # bytes parsed per thread task
+    CHART_EXECUTOR = os.getenv('CHART_EXECUTOR', 'process')  # 'process' or 'thread' (for threaded gunicorn workers)
+    CHART_WORKERS = int(os.getenv('CHART_WORKERS', 0)) or None  # chart render workers; None = min(cores, 8)
+    CHART_CACHE_DIR = os.getenv('CHART_CACHE_DIR', os.path.join(UPLOAD_FOLDER, 'charts'))
+    CHART_CACHE_MAX_BYTES = int(os.getenv('CHART_CACHE_MAX_BYTES', 256 * 1024 * 1024))  # rendered PNGs on disk
+    CHART_TOP_K = int(os.getenv('CHART_TOP_K', 20))  # bars per categorical chart; the rest are grouped as "Other"
+    SCATTER_MAX_POINTS = int(os.getenv('SCATTER_MAX_POINTS', 50_000))  # larger Actual vs Predicted plots are condensed
+    SCATTER_MODE = os.getenv('SCATTER_MODE', 'density')  # 'density' (2-D histogram) or 'sample' (stratified downsample)
+    COMPACT_LOAD = os.getenv('COMPACT_LOAD', 'false').lower() == 'true'  # downcast numerics, categorize text
\ No newline at end of file
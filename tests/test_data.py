@@ -0,0 +1,293 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import zipfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from app import create_app, db
+from app.data.appends import append_rows
+from app.data.models import DataFile
+from app.data.profiles import build_profile, compute_profile
+from app.data.uploads import ChecksumMismatch, ChunkedUpload, UploadTooLarge, store_blob
+from app.data.utils import get_file_extension
+from app.utils.correlation import correlation_matrix, heatmap_view
+from app.utils.csv_reader import CSVReader, check_zip
+from app.utils.datetimes import detect_datetime_formats, parse_datetime_columns
+from app.utils.sampling import ReservoirSample
+from app.utils.sketches import HyperLogLog, TopK
+from app.utils.streaming_stats import RunningMoments, StreamingSummary
+from config import Config
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+        CHART_CACHE_DIR = str(tmp_path / 'uploads' / 'charts')
+        CHART_EXECUTOR = 'thread'
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        yield app
+
+
+def _stored_csv(app, tmp_path, text):
+    # A DataFile whose CSV sits in the blob store, as an upload leaves it
+    data = text.encode()
+    upload = tmp_path / 'upload.tmp'
+    upload.write_bytes(data)
+    digest = hashlib.sha256(data).hexdigest()
+    data_file = DataFile(filename='data.csv', sha256=digest,
+                         filepath=store_blob(str(upload), app.config['UPLOAD_FOLDER'], digest, 'csv'))
+    db.session.add(data_file)
+    db.session.commit()
+    return data_file
+
+
+def test_csv_engines_agree_on_dtypes(tmp_path):
+    path = tmp_path / 'mixed.csv'
+    path.write_text(
+        'id,price,name,day,seen_at\n'
+        '1,9.5,apple,2020-01-01,2020-01-01T10:00:00\n'
+        '2,,pear,2020-01-02,2020-01-02T11:30:00\n'
+        '3,4.25,,2020-01-03,2020-01-03T12:45:00\n'
+    )
+
+    arrow = CSVReader(engine='pyarrow').read(str(path))
+    pandas = CSVReader(engine='pandas').read(str(path))
+
+    assert arrow.dtypes.astype(str).to_dict() == pandas.dtypes.astype(str).to_dict()
+    assert arrow['day'].tolist() == pandas['day'].tolist()
+    assert arrow['seen_at'].tolist() == pandas['seen_at'].tolist()
+
+
+def test_csv_engines_use_sniffed_delimiter(tmp_path):
+    path = tmp_path / 'semicolon.csv'
+    path.write_text('a;b\n1;x\n2;y\n')
+
+    for engine in ('pyarrow', 'pandas'):
+        assert list(CSVReader(engine=engine).read(str(path)).columns) == ['a', 'b']
+
+
+def test_topk_restored_state_merges_datetime_counts():
+    days = pd.Series(pd.to_datetime(['2020-01-01'] * 5 + ['2020-01-02'] * 2))
+    counter = TopK(8)
+    counter.update(days)
+
+    restored = TopK.from_state(json.loads(json.dumps(counter.to_state())))
+    restored.update(days)
+
+    assert restored.top() == [('2020-01-01 00:00:00', 10), ('2020-01-02 00:00:00', 4)]
+
+
+def test_hyperloglog_merges_int_and_float_chunks():
+    ints, floats = HyperLogLog(), HyperLogLog()
+    ints.update(pd.Series([1, 2, 3], dtype='int64'))
+    # The same values, read as float64 because the chunk has a blank
+    floats.update(pd.Series([1.0, 2.0, 3.0, np.nan]))
+    ints.merge(floats)
+
+    assert ints.count() == 3
+
+
+def test_running_moments_merge_matches_numpy():
+    values = np.array([2.0, 4.0, 4.0, 5.0, np.nan, 7.0, 9.0, 1e6])
+    chunked, left, right = RunningMoments(), RunningMoments(), RunningMoments()
+    chunked.update(values[:3])
+    chunked.update(values[3:])
+    left.update(values[:5])
+    right.update(values[5:])
+    left.merge(right)
+
+    finite = values[~np.isnan(values)]
+    for moments in (chunked, left):
+        assert moments.count == len(finite)
+        assert moments.mean == pytest.approx(finite.mean())
+        assert moments.std == pytest.approx(finite.std(ddof=1))
+        assert (moments.min, moments.max) == (finite.min(), finite.max())
+
+
+def test_append_merges_profile_like_a_recompute(app, tmp_path):
+    data_file = _stored_csv(app, tmp_path, 'id;price;name\n1;9.5;apple\n2;4.0;pear\n3;1.25;apple\n')
+    build_profile(data_file)
+    source = tmp_path / 'more.csv'
+    source.write_text('id;price;name\n4;;plum\n5;7.5;apple\n')
+
+    assert append_rows(data_file, str(source)) == 2
+    with open(data_file.filepath) as f:
+        # Written in the dataset's own dialect, so the blob still reads as one CSV
+        assert f.read().endswith('3;1.25;apple\n4;;plum\n5;7.5;apple\n')
+
+    merged = json.loads(data_file.profile.summary)
+    recomputed, _ = compute_profile(data_file)
+    assert tuple(merged['shape']) == recomputed['shape'] == (5, 3)
+    assert merged['missing_values'] == recomputed['missing_values']
+    assert merged['cardinality'] == recomputed['cardinality']
+    for col, top in recomputed['top_values'].items():
+        assert sorted(map(tuple, merged['top_values'][col])) == sorted(map(tuple, top))
+    for col in ('id', 'price'):
+        for stat in ('count', 'mean', 'std', 'min', 'max'):
+            assert merged['describe'][col][stat] == pytest.approx(recomputed['describe'][col][stat])
+
+
+def test_streaming_summary_resumes_from_saved_state():
+    df = pd.DataFrame({
+        'value': [1.5, 2.0, np.nan, 4.0, 8.5, 3.0],
+        'count': [1, 2, 3, 4, 5, 6],
+        'label': ['a', 'b', 'a', None, 'c', 'a']
+    })
+    whole = StreamingSummary()
+    whole.update(df.iloc[:3])
+    whole.update(df.iloc[3:])
+
+    resumed = StreamingSummary()
+    resumed.update(df.iloc[:3])
+    resumed = StreamingSummary.from_state(json.loads(json.dumps(resumed.to_state())))
+    resumed.update(df.iloc[3:])
+
+    assert resumed.result() == whole.result()
+    assert resumed.result()['missing_values'] == {'value': 1, 'count': 0, 'label': 1}
+
+
+def test_reservoir_sample_keeps_a_uniform_subset():
+    rows = pd.DataFrame({'id': np.arange(100)})
+    picked = np.zeros(100)
+    for seed in range(2000):
+        reservoir = ReservoirSample(10, seed=seed)
+        for start, stop in ((0, 7), (7, 40), (40, 100)):
+            reservoir.update(rows.iloc[start:stop])
+        ids = reservoir.frame['id'].to_numpy()
+        assert reservoir.rows == 100
+        assert len(ids) == len(set(ids)) == 10
+        picked[ids] += 1
+
+    # Every row should be kept in about 10% of the runs, chunk boundaries or not
+    assert np.all(np.abs(picked / 2000 - 0.1) < 0.035)
+
+
+def test_reservoir_sample_resumes_a_saved_sample():
+    reservoir = ReservoirSample(5, seed=1)
+    reservoir.update(pd.DataFrame({'id': np.arange(3)}))
+    resumed = ReservoirSample.resume(reservoir.frame, reservoir.rows, 5, seed=1)
+    resumed.update(pd.DataFrame({'id': np.arange(3, 50)}))
+
+    assert resumed.rows == 50
+    assert len(resumed.frame) == 5
+    assert set(resumed.frame['id']) <= set(range(50))
+
+
+@pytest.mark.parametrize('suffix', ['.csv.gz', '.csv.zst', '.csv.zip', '.zip'])
+def test_compressed_csvs_read_like_plain_ones(tmp_path, suffix):
+    text = 'id,name\n' + ''.join(f'{i},row {i}\n' for i in range(250))
+    plain = tmp_path / 'data.csv'
+    plain.write_text(text)
+    path = str(tmp_path / f'data{suffix}')
+    if suffix == '.csv.gz':
+        with gzip.open(path, 'wt') as f:
+            f.write(text)
+    elif suffix == '.csv.zst':
+        with pa.output_stream(path, compression='zstd') as f:
+            f.write(text.encode())
+    else:
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('export/data.csv', text)
+
+    expected = CSVReader(engine='pandas').read(str(plain))
+    for engine in ('pyarrow', 'pandas'):
+        reader = CSVReader(engine=engine)
+        pd.testing.assert_frame_equal(reader.read(path), expected)
+        chunks = list(reader.iter_chunks(path, 100))
+        assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+
+def test_chunked_upload_resumes_after_an_interruption(tmp_path):
+    folder = str(tmp_path)
+    data = b'a,b\n' + b'1,2\n' * 1000
+    upload = ChunkedUpload.create(folder, 1, 'data.csv')
+    upload.append(io.BytesIO(data[:1500]), 0)
+
+    # A new request only has the id; it asks for the offset and continues from there
+    resumed = ChunkedUpload.load(folder, upload.upload_id)
+    assert resumed.offset == 1500
+    with pytest.raises(ValueError):
+        resumed.append(io.BytesIO(data[1000:]), 1000)
+    with pytest.raises(UploadTooLarge):
+        resumed.append(io.BytesIO(data[1500:]), 1500, max_bytes=len(data) - 1)
+    assert resumed.offset == 1500
+    assert resumed.append(io.BytesIO(data[1500:]), 1500) == len(data)
+
+    with pytest.raises(ChecksumMismatch):
+        resumed.finish('csv', expected_sha256='0' * 64)
+    path, digest = resumed.finish('csv', expected_sha256=hashlib.sha256(data).hexdigest())
+    with open(path, 'rb') as f:
+        assert f.read() == data
+    assert not os.path.exists(resumed.part_path) and not os.path.exists(resumed.meta_path)
+    assert ChunkedUpload.load(folder, upload.upload_id) is None
+
+
+def test_datetime_formats_are_detected_and_parsed():
+    df = pd.DataFrame({
+        'day': ['2021-03-01', '2021-03-02', None, '2021-03-31'],
+        'european': ['31/01/2021', '01/02/2021', '15/02/2021', '28/02/2021'],
+        'stamp': ['2021-03-01 10:00:00', '2021-03-01 10:30:00', '2021-03-01 11:00:00', 'not a date'],
+        'year': ['2019', '2020', '2021', '2022'],
+        'name': ['a', 'b', 'c', 'd']
+    })
+
+    formats = detect_datetime_formats(df)
+    # 'stamp' has one bad value in four, below the share a date column needs
+    assert formats == {'day': '%Y-%m-%d', 'european': '%d/%m/%Y'}
+
+    parsed = parse_datetime_columns(df, formats)
+    assert parsed['european'].tolist()[0] == pd.Timestamp('2021-01-31')
+    assert parsed['day'].isna().tolist() == [False, False, True, False]
+    assert not pd.api.types.is_datetime64_any_dtype(df['day'])
+
+
+def test_correlation_matrix_matches_pandas_and_prunes_wide_heatmaps():
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=500)
+    df = pd.DataFrame(rng.normal(size=(500, 40)), columns=[f'noise{i}' for i in range(40)])
+    for i in range(5):
+        df[f'linked{i}'] = base + rng.normal(scale=0.2, size=500)
+    df.iloc[::7, 3] = np.nan
+
+    corr = correlation_matrix(df)
+    pd.testing.assert_frame_equal(corr, df.corr(), atol=1e-4)
+
+    view = heatmap_view(corr, limit=5)
+    assert sorted(view.columns) == [f'linked{i}' for i in range(5)]
+    assert list(view.index) == list(view.columns)
+
+
+def test_file_extensions_keep_only_known_compound_suffixes():
+    assert get_file_extension('sales.CSV.GZ') == 'csv.gz'
+    assert get_file_extension('sales.2024.csv.zip') == 'csv.zip'
+    assert get_file_extension('sales.2024.zip') == 'zip'
+    assert get_file_extension('sales.v2.csv') == 'csv'
+    assert get_file_extension('.csv.gz') == 'gz'
+
+
+def test_zip_uploads_need_exactly_one_csv(tmp_path):
+    def archive(name, members):
+        path = str(tmp_path / name)
+        with zipfile.ZipFile(path, 'w') as f:
+            for member in members:
+                f.writestr(member, 'a,b\n1,2\n')
+        return path
+
+    check_zip(archive('one.zip', ['data.csv', 'README.txt', '__MACOSX/._data.csv']))
+    for name, members in (('none.zip', ['README.txt']), ('two.zip', ['a.csv', 'b.csv'])):
+        with pytest.raises(ValueError):
+            check_zip(archive(name, members))
+    not_a_zip = tmp_path / 'fake.zip'
+    not_a_zip.write_text('a,b\n1,2\n')
+    with pytest.raises(ValueError):
+        check_zip(str(not_a_zip))